@@ -1,19 +1,1099 @@
 import requests
-from bs4 import BeautifulSoup
-import pandas as pd
 import time
 import random
 import re
-import matplotlib.pyplot as plt
-import seaborn as sns
 import os
-from datetime import datetime
+import shutil
+import sqlite3
+import sys
+import asyncio
+import argparse
+import contextlib
+import cProfile
+import csv
+import importlib
+import io
+import pstats
+import gzip
+import hashlib
+import html
+import json
+import multiprocessing
+import queue
+import threading
+import uuid
+from collections import OrderedDict
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from requests.adapters import HTTPAdapter
+from urllib.parse import unquote, urlparse
+
+class _LazyModule:
+    """Stands in for a heavy module until its first attribute access, then imports it and
+    replaces itself in this module's globals, so later lookups cost nothing extra"""
+    def __init__(self, name, alias):
+        self._name = name
+        self._alias = alias
+
+    def __getattr__(self, attr):
+        module = importlib.import_module(self._name)
+        globals()[self._alias] = module
+        return getattr(module, attr)
+
+# pandas and numpy are only needed from cleaning on; a fetch-only worker never loads them
+pd = _LazyModule('pandas', 'pd')
+np = _LazyModule('numpy', 'np')
+
+class HostScheduler:
+    """Per-host concurrency limits and politeness delays for async or threaded fetching"""
+    def __init__(self, per_host_limit=2, min_delay=2, max_delay=5):
+        self.per_host_limit = per_host_limit
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self._semaphores = {}
+        self._next_start = {}
+        self._thread_semaphores = {}
+        self._thread_next_start = {}
+        self._thread_lock = threading.Lock()
+
+    @contextlib.asynccontextmanager
+    async def slot(self, url):
+        """Wait for a free per-host slot and the host's next polite start time"""
+        host = urlparse(url).netloc
+        if host not in self._semaphores:
+            self._semaphores[host] = asyncio.Semaphore(self.per_host_limit)
+
+        async with self._semaphores[host]:
+            # Reserve a start time for this request before awaiting, so requests
+            # to the same host are spaced out even when several slots are free
+            now = asyncio.get_running_loop().time()
+            start = max(now, self._next_start.get(host, now))
+            self._next_start[host] = start + random.uniform(self.min_delay, self.max_delay)
+            if start > now:
+                await asyncio.sleep(start - now)
+            yield
+
+    @contextlib.contextmanager
+    def thread_slot(self, url):
+        """slot() for fetches made from worker threads rather than an event loop"""
+        host = urlparse(url).netloc
+        with self._thread_lock:
+            if host not in self._thread_semaphores:
+                self._thread_semaphores[host] = threading.Semaphore(self.per_host_limit)
+            semaphore = self._thread_semaphores[host]
+
+        with semaphore:
+            with self._thread_lock:
+                now = time.monotonic()
+                start = max(now, self._thread_next_start.get(host, now))
+                self._thread_next_start[host] = start + random.uniform(self.min_delay, self.max_delay)
+            if start > now:
+                time.sleep(start - now)
+            yield
+
+class CircuitBreaker:
+    """Stops fetching once too many consecutive requests have failed"""
+    def __init__(self, failure_threshold=5):
+        self.failure_threshold = failure_threshold
+        self.consecutive_failures = 0
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        return self.consecutive_failures >= self.failure_threshold
+
+    def record_success(self):
+        with self._lock:
+            self.consecutive_failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+
+class FetchStats:
+    """Per-request latency and retry counters for the fetch layer"""
+    def __init__(self):
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.blocked = 0
+        self.status_counts = {}
+        self.latencies = []
+        self.backoff_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record_request(self, latency, status_code=None):
+        with self._lock:
+            self.requests += 1
+            self.latencies.append(latency)
+            key = status_code if status_code is not None else 'error'
+            self.status_counts[key] = self.status_counts.get(key, 0) + 1
+
+    def record_retry(self, sleep_time):
+        with self._lock:
+            self.retries += 1
+            self.backoff_seconds += sleep_time
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+
+    def record_blocked(self):
+        with self._lock:
+            self.blocked += 1
+
+    def summary(self):
+        """Return the counters plus latency percentiles as a plain dict"""
+        latencies = sorted(self.latencies)
+
+        def percentile(p):
+            if not latencies:
+                return None
+            return latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))]
+
+        return {
+            'requests': self.requests,
+            'retries': self.retries,
+            'failures': self.failures,
+            'blocked': self.blocked,
+            'status_counts': dict(self.status_counts),
+            'backoff_seconds': round(self.backoff_seconds, 3),
+            'latency_p50': percentile(50),
+            'latency_p95': percentile(95),
+            'latency_max': latencies[-1] if latencies else None,
+        }
+
+class Metrics:
+    """Counters, gauges and histograms for every pipeline stage, exported as Prometheus
+    text or JSON. Disabled by default, when every recording call returns at once."""
+    PREFIX = 'amazon_scraper_'
+    DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                       1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+    def __init__(self, enabled=False, profile_stages=(), profile_dir='profiles'):
+        self.enabled = enabled
+        self.profile_stages = set(profile_stages)
+        self.profile_dir = profile_dir
+        self.counters = {}    # (name, labels) -> value
+        self.gauges = {}      # (name, labels) -> value
+        self.histograms = {}  # (name, labels) -> [bucket counts, sum, count]
+        self._lock = threading.Lock()
+
+    def enable(self, profile_stages=(), profile_dir='profiles'):
+        self.enabled = True
+        self.profile_stages = set(profile_stages)
+        self.profile_dir = profile_dir
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.gauges.clear()
+            self.histograms.clear()
+
+    def inc(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def observe(self, name, value, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [[0] * len(self.DEFAULT_BUCKETS), 0.0, 0]
+            for i, bound in enumerate(self.DEFAULT_BUCKETS):
+                if value <= bound:
+                    histogram[0][i] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    def timer(self, name, **labels):
+        """Context manager observing its duration in seconds into a histogram"""
+        if not self.enabled:
+            return contextlib.nullcontext()
+        return self._timed(name, labels)
+
+    @contextlib.contextmanager
+    def _timed(self, name, labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def stage(self, name):
+        """Time a pipeline stage, and run it under cProfile if it was asked to be profiled"""
+        if name in self.profile_stages:
+            return self._profiled(name)
+        return self.timer('stage_seconds', stage=name)
+
+    @contextlib.contextmanager
+    def _profiled(self, name):
+        profiler = cProfile.Profile()
+        with self.timer('stage_seconds', stage=name):
+            profiler.enable()
+            try:
+                yield
+            finally:
+                profiler.disable()
+        os.makedirs(self.profile_dir, exist_ok=True)
+        path = os.path.join(self.profile_dir, f"{name}.prof")
+        profiler.dump_stats(path)
+        summary = io.StringIO()
+        pstats.Stats(profiler, stream=summary).sort_stats('cumulative').print_stats(15)
+        print(f"Profile of stage '{name}' saved to {path} (open with snakeviz or pstats)")
+        print(summary.getvalue())
+
+    @staticmethod
+    def _label_text(labels, extra=()):
+        pairs = [*labels, *extra]
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{key}="{str(value)}"' for key, value in pairs) + '}'
+
+    def to_prometheus(self):
+        """Everything recorded, in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            for kind, series in (('counter', self.counters), ('gauge', self.gauges)):
+                typed = set()
+                for (name, labels), value in sorted(series.items()):
+                    if name not in typed:
+                        lines.append(f"# TYPE {self.PREFIX}{name} {kind}")
+                        typed.add(name)
+                    lines.append(f"{self.PREFIX}{name}{self._label_text(labels)} {value}")
+            typed = set()
+            for (name, labels), (buckets, total, count) in sorted(self.histograms.items()):
+                if name not in typed:
+                    lines.append(f"# TYPE {self.PREFIX}{name} histogram")
+                    typed.add(name)
+                for bound, bucket_count in zip(self.DEFAULT_BUCKETS, buckets):
+                    lines.append(f"{self.PREFIX}{name}_bucket{self._label_text(labels, [('le', bound)])} "
+                                 f"{bucket_count}")
+                lines.append(f"{self.PREFIX}{name}_bucket{self._label_text(labels, [('le', '+Inf')])} {count}")
+                lines.append(f"{self.PREFIX}{name}_sum{self._label_text(labels)} {total}")
+                lines.append(f"{self.PREFIX}{name}_count{self._label_text(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def to_dict(self):
+        """Everything recorded, as plain JSON-serializable data"""
+        def series(items, value):
+            return [{'name': name, 'labels': dict(labels), **value(data)} for (name, labels), data in items]
+
+        with self._lock:
+            return {
+                'counters': series(sorted(self.counters.items()), lambda v: {'value': v}),
+                'gauges': series(sorted(self.gauges.items()), lambda v: {'value': v}),
+                'histograms': series(sorted(self.histograms.items()), lambda h: {
+                    'buckets': dict(zip(map(str, self.DEFAULT_BUCKETS), h[0])),
+                    'sum': round(h[1], 6), 'count': h[2]}),
+            }
+
+    def write(self, path):
+        """Write JSON for a .json path, Prometheus text for anything else"""
+        with open(path, 'w', encoding='utf-8') as f:
+            if path.endswith('.json'):
+                json.dump(self.to_dict(), f, indent=2)
+            else:
+                f.write(self.to_prometheus())
+        return path
+
+# Process-wide registry; enabled from the command line with --metrics-file or --profile
+METRICS = Metrics()
+
+# Markers of Amazon's robot-check interstitial, which is served with status 200
+BLOCK_PAGE_MARKERS = (
+    '/errors/validateCaptcha',
+    'Type the characters you see in this image',
+    'Enter the characters you see below',
+    "Sorry, we just need to make sure you're not a robot",
+)
+
+def is_block_page(html_content):
+    """Whether a response body is a CAPTCHA / robot-check page instead of results"""
+    return any(marker in html_content for marker in BLOCK_PAGE_MARKERS)
+
+class AdaptiveRateLimiter:
+    """Token bucket whose rate follows the target: additive increase while responses
+    are fast and clean, multiplicative decrease on throttling, blocks and slowdowns"""
+    def __init__(self, rate=1.0, min_rate=0.05, max_rate=10.0, burst=2, increase=0.1,
+                 decrease=0.5, slowdown=0.8, latency_factor=3.0, throttle_status_codes=(429, 503),
+                 clock=time.monotonic, sleep=time.sleep):
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        # Kept within the same bounds _set_rate applies to every later adjustment
+        self.rate = min(max_rate, max(min_rate, rate))
+        self.burst = burst
+        self.increase = increase
+        self.decrease = decrease
+        self.slowdown = slowdown
+        self.latency_factor = latency_factor
+        self.throttle_status_codes = frozenset(throttle_status_codes)
+        self.clock = clock
+        self.sleep = sleep
+
+        self.tokens = float(burst)
+        self.latency_ewma = None
+        self.paused_until = 0.0
+        self.counts = {'acquired': 0, 'increases': 0, 'throttled': 0, 'blocked': 0,
+                       'slow': 0, 'errors': 0, 'rejected': 0}
+        self.wait_seconds = 0.0
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """Block until a request may start; returns the time waited"""
+        with self._lock:
+            now = self.clock()
+            self._refill(now)
+            # Take the token now, possibly going into debt, so concurrent callers queue up
+            self.tokens -= 1
+            wait = max(0.0, -self.tokens / self.rate, self.paused_until - now)
+            self.counts['acquired'] += 1
+            self.wait_seconds += wait
+        if wait > 0:
+            self.sleep(wait)
+        return wait
+
+    def record(self, status_code=None, latency=None, blocked=False, retry_after=None):
+        """Adjust the rate from one response's status, latency and block-page check"""
+        with self._lock:
+            if blocked or status_code in self.throttle_status_codes:
+                self.counts['blocked' if blocked else 'throttled'] += 1
+                self._set_rate(self.rate * self.decrease)
+                # Drop any saved-up burst so the slower rate applies immediately
+                self.tokens = min(self.tokens, 0.0)
+                if retry_after is not None:
+                    self.paused_until = max(self.paused_until, self.clock() + retry_after)
+            elif status_code is None or status_code >= 500:
+                self.counts['errors'] += 1
+                self._set_rate(self.rate * self.slowdown)
+            elif not (200 <= status_code < 300 or status_code == 304):
+                # A 404 or other refusal says nothing about how hard the server is loaded
+                self.counts['rejected'] += 1
+            elif latency is not None and self.latency_ewma is not None and \
+                    latency > self.latency_factor * self.latency_ewma:
+                # The server is slowing down before it starts refusing
+                self.counts['slow'] += 1
+                self._set_rate(self.rate * self.slowdown)
+            else:
+                if latency is not None:
+                    self.latency_ewma = latency if self.latency_ewma is None else \
+                        0.8 * self.latency_ewma + 0.2 * latency
+                self.counts['increases'] += 1
+                self._set_rate(self.rate + self.increase)
+
+    def _set_rate(self, rate):
+        self._refill(self.clock())
+        self.rate = min(self.max_rate, max(self.min_rate, rate))
+
+    def metrics(self):
+        """Limiter state and counters as a plain dict"""
+        with self._lock:
+            return {
+                'rate': round(self.rate, 4),
+                'tokens': round(self.tokens, 3),
+                'latency_ewma': None if self.latency_ewma is None else round(self.latency_ewma, 4),
+                'paused_seconds': round(max(0.0, self.paused_until - self.clock()), 3),
+                'wait_seconds': round(self.wait_seconds, 3),
+                **self.counts,
+            }
+
+class ParserBackend:
+    """Base class for HTML parser backends used by extract_sponsored_products"""
+    name = None
+
+    # CSS selectors used on each result card, keyed by the field they locate
+    CARD_SELECTOR = 'div[data-component-type="s-search-result"]'
+    SELECTORS = {
+        'sponsored_tag': 'span.s-label-popover-default .a-color-secondary',
+        'alt_sponsored_tag': '.puis-sponsored-label-text',
+        'title': 'h2 a.a-link-normal span',
+        'product_link': 'h2 a.a-link-normal',
+        'brand': '.a-size-base.a-color-secondary',
+        'alt_brand': 'h5 .a-size-base',
+        'rating': 'i.a-icon-star-small span',
+        'reviews': 'span.a-size-base.s-underline-text',
+        'price': '.a-price-whole',
+        'image': 'img.s-image',
+    }
+
+    # BeautifulSoup turns these attributes into lists, so they never count as
+    # string attributes; other backends skip them to give the same results
+    MULTI_VALUED_ATTRS = {'class', 'rel', 'rev', 'accept-charset', 'headers', 'accesskey', 'dropzone'}
+
+    def cards(self, html_content):
+        """Return the result card nodes of a search page"""
+        raise NotImplementedError
+
+    def select_one(self, node, key):
+        """Return the first node under `node` matching SELECTORS[key], or None"""
+        raise NotImplementedError
+
+    def text(self, node):
+        """Return the node text the way BeautifulSoup's get_text(strip=True) does"""
+        raise NotImplementedError
+
+    def attr(self, node, name):
+        raise NotImplementedError
+
+    def attrs(self, node):
+        raise NotImplementedError
+
+class Bs4Backend(ParserBackend):
+    """BeautifulSoup backend with precompiled soupsieve selectors"""
+    name = 'bs4'
+
+    def __init__(self, features='html.parser'):
+        import soupsieve
+        from bs4 import BeautifulSoup
+        self._soup = BeautifulSoup
+        self.features = features
+        self.name = 'bs4' if features == 'html.parser' else f'bs4-{features}'
+        self._card_selector = soupsieve.compile(self.CARD_SELECTOR)
+        self._selectors = {key: soupsieve.compile(sel) for key, sel in self.SELECTORS.items()}
+
+    def cards(self, html_content):
+        return self._card_selector.select(self._soup(html_content, self.features))
+
+    def select_one(self, node, key):
+        return self._selectors[key].select_one(node)
+
+    def text(self, node):
+        return node.get_text(strip=True)
+
+    def attr(self, node, name):
+        return node.get(name)
+
+    def attrs(self, node):
+        return node.attrs
+
+class LxmlBackend(ParserBackend):
+    """lxml backend with selectors precompiled to XPath via cssselect"""
+    name = 'lxml'
+
+    def __init__(self):
+        try:
+            import lxml.html
+            from lxml.cssselect import CSSSelector
+        except ImportError as e:
+            raise ImportError("The 'lxml' parser backend needs: pip install lxml cssselect") from e
+        self._document_fromstring = lxml.html.document_fromstring
+        self._card_selector = CSSSelector(self.CARD_SELECTOR)
+        self._selectors = {key: CSSSelector(sel) for key, sel in self.SELECTORS.items()}
+
+    def cards(self, html_content):
+        return self._card_selector(self._document_fromstring(html_content))
+
+    def select_one(self, node, key):
+        matches = self._selectors[key](node)
+        return matches[0] if matches else None
+
+    def text(self, node):
+        parts = [node.text or '']
+        for child in node.iterdescendants():
+            # Comments and processing instructions carry no visible text, only their tails do
+            if isinstance(child.tag, str):
+                parts.append(child.text or '')
+            parts.append(child.tail or '')
+        return ''.join(part.strip() for part in parts)
+
+    def attr(self, node, name):
+        return node.get(name)
+
+    def attrs(self, node):
+        return {name: value for name, value in node.attrib.items()
+                if name not in self.MULTI_VALUED_ATTRS}
+
+class SelectolaxBackend(ParserBackend):
+    """selectolax (lexbor) backend"""
+    name = 'selectolax'
+
+    def __init__(self):
+        try:
+            from selectolax.lexbor import LexborHTMLParser
+        except ImportError as e:
+            raise ImportError("The 'selectolax' parser backend needs: pip install selectolax") from e
+        self._parser = LexborHTMLParser
+
+    def cards(self, html_content):
+        return self._parser(html_content).css(self.CARD_SELECTOR)
+
+    def select_one(self, node, key):
+        return node.css_first(self.SELECTORS[key])
+
+    def text(self, node):
+        return node.text(deep=True, separator='', strip=True)
+
+    def attr(self, node, name):
+        return node.attributes.get(name)
+
+    def attrs(self, node):
+        return {name: value for name, value in node.attributes.items()
+                if name not in self.MULTI_VALUED_ATTRS}
+
+# Result card start tags and any div open/close tag, used to cut cards out of
+# the raw page without building a tree for the whole document. Comments and the
+# bodies of elements parsers read as text (script, style, textarea, title) are
+# matched as whole spans so tags inside them are skipped. Div tags are matched up
+# to their closing '>' past any quoted attribute values, as is any other tag with
+# a '<' in a quoted value, so '</div>' in an attribute value is not taken for a tag.
+# Each pattern starts with a literal '<', which lets re jump from one '<' to the next.
+_OPAQUE_SPAN = r'!--.*?-->|(?P<raw>script|style|textarea|title)\b.*?</(?P=raw)\s*>'
+_ATTRIBUTES = r'(?:[^>"\']|"[^"]*"|\'[^\']*\')*'
+_CARD_START_RE = re.compile(
+    r'<(?:' + _OPAQUE_SPAN
+    + r'|(?P<card>div\b[^>]*\bdata-component-type=["\']s-search-result["\'][^>]*>))',
+    re.I | re.S)
+_DIV_TAG_RE = re.compile(
+    r'<(?:' + _OPAQUE_SPAN + r'|(?P<close>/?)div\b' + _ATTRIBUTES + '>'
+    + r'|[a-z][^\s/>]*\s(?:[^>"\']|"[^"<]*"|\'[^\'<]*\')*(?:"[^"<]*<|\'[^\'<]*<)' + _ATTRIBUTES + '>)',
+    re.I | re.S)
+
+def iter_card_fragments(html_content):
+    """Yield the raw markup of each result card by matching its div nesting"""
+    pos = 0
+    while True:
+        start = _CARD_START_RE.search(html_content, pos)
+        if not start:
+            return
+        if not start.group('card'):
+            pos = start.end()
+            continue
+        depth = 1
+        end = len(html_content)
+        for tag in _DIV_TAG_RE.finditer(html_content, start.end()):
+            if tag.group('close') is None:
+                continue
+            depth += -1 if tag.group('close') else 1
+            if depth == 0:
+                end = tag.end()
+                break
+        yield html_content[start.start():end]
+        pos = end
+
+PARSER_BACKENDS = {
+    'bs4': Bs4Backend,
+    'bs4-lxml': lambda: Bs4Backend('lxml'),
+    'lxml': LxmlBackend,
+    'selectolax': SelectolaxBackend,
+}
+
+def get_parser_backend(name):
+    """Build the parser backend registered under `name`"""
+    if isinstance(name, ParserBackend):
+        return name
+    if name not in PARSER_BACKENDS:
+        raise ValueError(f"Unknown parser backend '{name}', choose from {sorted(PARSER_BACKENDS)}")
+    return PARSER_BACKENDS[name]()
+
+class PageArchive:
+    """Compressed, content-addressed archive of raw search pages, written on a background thread"""
+    def __init__(self, directory='amazon_page_archive', max_bytes=500 * 1024 * 1024,
+                 max_age_days=7, compresslevel=6, prune_every=50):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age_days = max_age_days
+        self.compresslevel = compresslevel
+        self.prune_every = prune_every
+        self.index_path = os.path.join(directory, 'index.jsonl')
+        self._queue = queue.Queue()
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        self._writes_since_prune = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, digest):
+        return os.path.join(self.directory, f"{digest}.html.gz")
+
+    def submit(self, html_content, url=None):
+        """Queue a page for archiving and return its content hash"""
+        # Fetch threads submit concurrently; only one of them may start the writer
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, daemon=True)
+                self._writer.start()
+        digest = hashlib.sha256(html_content.encode('utf-8')).hexdigest()
+        self._queue.put((digest, html_content, url, datetime.now().isoformat()))
+        return digest
+
+    def _write_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                return
+            try:
+                self._write(*item)
+            except OSError as e:
+                print(f"Error archiving page: {e}")
+            self._queue.task_done()
+
+    def _write(self, digest, html_content, url, fetched_at):
+        path = self._path(digest)
+        # Identical pages share one file; only the index records each fetch
+        if not os.path.exists(path):
+            tmp_path = f"{path}.tmp"
+            with gzip.open(tmp_path, 'wt', encoding='utf-8', compresslevel=self.compresslevel) as f:
+                f.write(html_content)
+            os.replace(tmp_path, path)
+        else:
+            # prune ages pages by mtime, so a page fetched again counts as fresh
+            os.utime(path)
+        with open(self.index_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({'sha256': digest, 'url': url, 'fetched_at': fetched_at}) + "\n")
+
+        self._writes_since_prune += 1
+        if self._writes_since_prune >= self.prune_every:
+            self.prune()
+
+    def flush(self):
+        """Wait until every queued page has been written"""
+        self._queue.join()
+
+    def close(self):
+        """Write any queued pages, stop the writer thread and apply retention"""
+        with self._writer_lock:
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            self._queue.put(None)
+            writer.join()
+        self.prune()
+
+    def prune(self):
+        """Delete pages older than max_age_days, then the oldest pages until under max_bytes"""
+        self._writes_since_prune = 0
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.html.gz'):
+                path = os.path.join(self.directory, name)
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+
+        cutoff = time.time() - self.max_age_days * 86400
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for mtime, size, path in entries:
+            if mtime >= cutoff and total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+            removed += 1
+        if removed:
+            print(f"Pruned {removed} archived pages from {self.directory}")
+            self._compact_index()
+        return removed
+
+    def _compact_index(self):
+        """Drop index records whose page file has been pruned"""
+        if not os.path.exists(self.index_path):
+            return
+        with open(self.index_path, encoding='utf-8') as f:
+            lines = [line for line in f
+                     if os.path.exists(self._path(json.loads(line)['sha256']))]
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.writelines(lines)
+        os.replace(tmp_path, self.index_path)
+
+    def iter_pages(self):
+        """Yield (index record, html) for archived pages still on disk, in fetch order"""
+        if not os.path.exists(self.index_path):
+            return
+        with open(self.index_path, encoding='utf-8') as f:
+            for line in f:
+                record = json.loads(line)
+                path = self._path(record['sha256'])
+                if os.path.exists(path):
+                    with gzip.open(path, 'rt', encoding='utf-8') as page:
+                        yield record, page.read()
+
+    def replay(self, scraper):
+        """Re-run extraction over the archived pages offline"""
+        products = ProductBatch()
+        for record, html_content in self.iter_pages():
+            print(f"Replaying {record['url'] or record['sha256']}...")
+            scraper.extract_into(html_content, products)
+        return products
+
+class ResponseCache:
+    """On-disk HTTP response cache keyed by normalized URL and headers, with TTL and LRU eviction"""
+    # Request headers that change the page Amazon returns, and so belong in the cache key
+    VARY_HEADERS = ('Accept', 'Accept-Language', 'User-Agent')
+
+    def __init__(self, directory='amazon_http_cache', ttl=3600, max_bytes=200 * 1024 * 1024):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._total_bytes = sum(os.path.getsize(os.path.join(directory, name))
+                                for name in os.listdir(directory))
+
+    @staticmethod
+    def normalize_url(url):
+        """Lower-case scheme and host, sort query parameters and drop the fragment"""
+        parts = urlparse(url)
+        query = '&'.join(sorted(parts.query.split('&'))) if parts.query else ''
+        return f"{parts.scheme.lower()}://{parts.netloc.lower()}{parts.path or '/'}" + (f"?{query}" if query else '')
+
+    def key(self, url, headers):
+        vary = {name: headers.get(name) for name in self.VARY_HEADERS}
+        raw = json.dumps([self.normalize_url(url), vary], sort_keys=True)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _paths(self, key):
+        base = os.path.join(self.directory, key)
+        return f"{base}.json", f"{base}.html.gz"
+
+    def _read_meta(self, key):
+        meta_path, body_path = self._paths(key)
+        try:
+            with open(meta_path, encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+        return meta if os.path.exists(body_path) else None
+
+    def is_fresh(self, url, headers):
+        """Whether a response younger than the TTL is cached; does not count as a lookup"""
+        meta = self._read_meta(self.key(url, headers))
+        return meta is not None and time.time() - meta['stored_at'] < self.ttl
+
+    def get(self, url, headers):
+        """Return the cached entry (fresh or stale, for revalidation) or None"""
+        key = self.key(url, headers)
+        meta = self._read_meta(key)
+        if meta is None:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        meta_path, body_path = self._paths(key)
+        with gzip.open(body_path, 'rt', encoding='utf-8') as f:
+            meta['body'] = f.read()
+        meta['key'] = key
+        meta['fresh'] = time.time() - meta['stored_at'] < self.ttl
+        with self._lock:
+            if meta['fresh']:
+                self.hits += 1
+            else:
+                self.misses += 1
+        # File access times are unreliable (noatime mounts), so mtime marks recent use for LRU
+        os.utime(body_path)
+        return meta
+
+    def conditional_headers(self, entry):
+        """Headers for revalidating a stale entry with the origin"""
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def refresh(self, entry):
+        """Mark a stale entry fresh again after a 304 Not Modified"""
+        with self._lock:
+            self.revalidated += 1
+        meta_path, _ = self._paths(entry['key'])
+        meta = {k: entry[k] for k in ('url', 'etag', 'last_modified')}
+        meta['stored_at'] = time.time()
+        with open(meta_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+
+    def put(self, url, headers, body, etag=None, last_modified=None):
+        key = self.key(url, headers)
+        meta_path, body_path = self._paths(key)
+        old_size = sum(os.path.getsize(path) for path in (meta_path, body_path) if os.path.exists(path))
+
+        tmp_path = f"{body_path}.tmp.{threading.get_ident()}"
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            f.write(body)
+        os.replace(tmp_path, body_path)
+        with open(meta_path, 'w', encoding='utf-8') as f:
+            json.dump({'url': url, 'stored_at': time.time(), 'etag': etag,
+                       'last_modified': last_modified}, f)
+
+        with self._lock:
+            self._total_bytes += os.path.getsize(meta_path) + os.path.getsize(body_path) - old_size
+            over_limit = self._total_bytes > self.max_bytes
+        if over_limit:
+            self._evict()
+
+    def _evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes"""
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.html.gz'):
+                path = os.path.join(self.directory, name)
+                entries.append((os.path.getmtime(path), name[:-len('.html.gz')]))
+        entries.sort()
+
+        with self._lock:
+            for _, key in entries:
+                if self._total_bytes <= self.max_bytes:
+                    break
+                for path in self._paths(key):
+                    with contextlib.suppress(OSError):
+                        self._total_bytes -= os.path.getsize(path)
+                        os.remove(path)
+                self.evictions += 1
+
+    def summary(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'revalidated': self.revalidated,
+            'evictions': self.evictions,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else None,
+            'size_bytes': self._total_bytes,
+        }
+
+class ProductRecord(Mapping):
+    """One extracted product. Slotted, so it carries no per-instance dict or key strings.
+    A read-only mapping of field to value, so dict(record), record['brand'] and
+    pd.DataFrame(records) all see field names as keys"""
+    FIELDS = ('product_title', 'brand', 'rating', 'num_reviews', 'selling_price', 'image_url', 'product_url')
+    # Values repeated across many products; interning keeps one copy of each
+    INTERNED = ('brand', 'rating', 'num_reviews', 'selling_price')
+    __slots__ = FIELDS
+
+    def __init__(self, product_title, brand, rating, num_reviews, selling_price, image_url, product_url):
+        self.product_title = product_title
+        self.brand = sys.intern(brand) if type(brand) is str else brand
+        self.rating = sys.intern(rating) if type(rating) is str else rating
+        self.num_reviews = sys.intern(num_reviews) if type(num_reviews) is str else num_reviews
+        self.selling_price = sys.intern(selling_price) if type(selling_price) is str else selling_price
+        self.image_url = image_url
+        self.product_url = product_url
+
+    @classmethod
+    def from_dict(cls, product):
+        return cls(*(product[field] for field in cls.FIELDS))
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    def keys(self):
+        return self.FIELDS
+
+    def values(self):
+        return self.astuple()
+
+    def astuple(self):
+        """Field values in FIELDS order, the positional arguments of the constructor"""
+        return tuple(getattr(self, field) for field in self.FIELDS)
+
+    def __getitem__(self, field):
+        if field not in self.FIELDS:
+            raise KeyError(field)
+        return getattr(self, field)
+
+    def __iter__(self):
+        return iter(self.FIELDS)
+
+    def __len__(self):
+        return len(self.FIELDS)
+
+    def __eq__(self, other):
+        if isinstance(other, ProductRecord):
+            return self.astuple() == other.astuple()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __reduce__(self):
+        # Pickle as a plain tuple of values when crossing to and from parse workers
+        return (ProductRecord, self.astuple())
+
+    def __repr__(self):
+        return f"ProductRecord({self.to_dict()!r})"
+
+class ProductBatch:
+    """Columnar product builder: one list per field, turned into a DataFrame or Arrow
+    table directly, without an intermediate list of dicts"""
+    def __init__(self, records=(), extra_columns=()):
+        self.extra_columns = tuple(extra_columns)
+        self.columns = {name: [] for name in (*self.extra_columns, *ProductRecord.FIELDS)}
+        self.extend(records)
+
+    def append(self, record, **extra):
+        """Add a ProductRecord (or any mapping with the product fields)"""
+        for name in self.extra_columns:
+            self.columns[name].append(extra.get(name))
+        for field in ProductRecord.FIELDS:
+            self.columns[field].append(record[field])
+
+    def extend(self, records, **extra):
+        for record in records:
+            self.append(record, **extra)
+
+    def __len__(self):
+        return len(self.columns['product_title'])
+
+    def __getitem__(self, index):
+        return ProductRecord(*(self.columns[field][index] for field in ProductRecord.FIELDS))
+
+    def __iter__(self):
+        return (ProductRecord(*values) for values in zip(*(self.columns[field] for field in ProductRecord.FIELDS)))
+
+    def __eq__(self, other):
+        if isinstance(other, ProductBatch):
+            return self.columns == other.columns
+        if isinstance(other, list):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    __hash__ = None
+
+    def to_dataframe(self):
+        return pd.DataFrame(self.columns, columns=list(self.columns))
+
+    def to_csv(self, path):
+        """Write the batch as CSV the way DataFrame.to_csv does, without importing pandas"""
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f, lineterminator=os.linesep)
+            writer.writerow(self.columns)
+            writer.writerows(zip(*self.columns.values()))
+        return path
+
+    def to_arrow(self):
+        """The batch as a pyarrow Table (needs pyarrow)"""
+        import pyarrow as pa
+        return pa.table({name: pa.array(values, type=pa.string()) for name, values in self.columns.items()})
+
+class CardMemo:
+    """Bounded LRU memo of extracted products, keyed by a hash of each card's raw markup,
+    so cards unchanged since an earlier crawl skip parsing and selector lookups"""
+    # Bump whenever card splitting or extraction changes, so saved memos built
+    # by the old code are discarded instead of replaying its results
+    FORMAT_VERSION = 2
+
+    def __init__(self, max_entries=20_000, path=None):
+        self.max_entries = max_entries
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # fingerprint -> tuple of ProductRecords, oldest first
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            self.load(path)
+
+    @staticmethod
+    def fingerprint(markup, base_url=''):
+        """Content hash of a card's markup; the base URL is part of every product URL"""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(base_url.encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(markup.encode('utf-8'))
+        return digest.hexdigest()
+
+    def get(self, key):
+        """The products extracted from this card before, or None"""
+        with self._lock:
+            products = self._entries.get(key)
+            if products is None:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        METRICS.inc('card_memo_misses_total' if products is None else 'card_memo_hits_total')
+        return products
+
+    def put(self, key, products):
+        products = tuple(products)
+        with self._lock:
+            self._entries[key] = products
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return products
+
+    def __len__(self):
+        return len(self._entries)
+
+    def summary(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            'entries': len(self._entries),
+            'evictions': self.evictions,
+        }
+
+    def save(self, path=None):
+        """Write the memo as JSON, oldest entries first so a reload keeps the LRU order"""
+        path = path or self.path
+        with self._lock:
+            entries = [[key, [list(product.astuple()) for product in products]]
+                       for key, products in self._entries.items()]
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': self.FORMAT_VERSION, 'entries': entries}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        return path
+
+    def load(self, path):
+        try:
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Ignoring unreadable card memo {path}: {e}")
+            return
+        if data.get('version') != self.FORMAT_VERSION:
+            print(f"Discarding card memo {path}: written by an older extractor "
+                  f"(format {data.get('version')}, expected {self.FORMAT_VERSION})")
+            return
+        for key, products in data.get('entries', []):
+            self.put(key, (ProductRecord(*fields) for fields in products))
 
 class AmazonSponsoredScraper:
-    def __init__(self, search_term, num_pages=3):
+    # Status codes worth retrying; anything else that is not 200 fails immediately
+    RETRY_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+    THROTTLE_STATUS_CODES = {429, 503}
+
+    def __init__(self, search_term, num_pages=3, base_url="https://www.amazon.in",
+                 max_in_flight=4, per_host_limit=2, pool_size=10, max_retries=3,
+                 backoff_base=2.0, backoff_cap=60.0, timeout=30, failure_threshold=5,
+                 parser_backend='bs4', streaming=False, archive=None, cache=None,
+                 rate_limiter=None, card_memo=None):
         self.search_term = search_term
         self.num_pages = num_pages
-        self.base_url = "https://www.amazon.in"
+        self.base_url = base_url
+        self.max_in_flight = max_in_flight
+        self.per_host_limit = per_host_limit
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.timeout = timeout
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
             'Accept-Language': 'en-US,en;q=0.9',
@@ -24,7 +1104,24 @@ class AmazonSponsoredScraper:
             'Upgrade-Insecure-Requests': '1',
             'Cache-Control': 'max-age=0'
         }
-        self.products = []
+        self.products = ProductBatch()
+
+        # Pooled session so connections are reused across pages and retries
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.breaker = CircuitBreaker(failure_threshold)
+        self.fetch_stats = FetchStats()
+        self.parser = get_parser_backend(parser_backend)
+        self.streaming = streaming
+        self.archive = archive
+        self.cache = cache
+        # When set, the limiter paces every request and zeroes the scheduler's random delays
+        self.rate_limiter = rate_limiter
+        # When set, cards are extracted one by one and unchanged ones come from the memo
+        self.card_memo = card_memo
         
     def search_url(self, page=1):
         """Generate search URL for the given page"""
@@ -32,196 +1129,1015 @@ class AmazonSponsoredScraper:
     
     def get_page(self, url):
         """Fetch page content with retries"""
-        max_retries = 3
-        for attempt in range(max_retries):
+        if self.breaker.is_open:
+            print(f"Circuit open for '{self.search_term}', not fetching {url}")
+            return None
+
+        cached = None
+        request_headers = {}
+        if self.cache is not None:
+            cached = self.cache.get(url, self.headers)
+            if cached is not None and cached['fresh']:
+                METRICS.inc('cache_hits_total')
+                return cached['body']
+            if cached is not None:
+                request_headers = self.cache.conditional_headers(cached)
+
+        for attempt in range(self.max_retries):
+            retry_after = None
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            started = time.perf_counter()
             try:
-                response = requests.get(url, headers=self.headers)
-                if response.status_code == 200:
+                response = self.session.get(url, headers=request_headers, timeout=self.timeout)
+                latency = time.perf_counter() - started
+                self.fetch_stats.record_request(latency, response.status_code)
+                METRICS.observe('fetch_seconds', latency, status=response.status_code)
+                METRICS.inc('fetch_bytes_total', len(response.content))
+                # Check for a robot-check page before anything parses, caches or archives it
+                blocked = response.status_code == 200 and is_block_page(response.text)
+                if response.status_code in self.THROTTLE_STATUS_CODES:
+                    retry_after = self._parse_retry_after(response.headers.get('Retry-After'))
+                if self.rate_limiter is not None:
+                    self.rate_limiter.record(response.status_code, latency, blocked, retry_after)
+                if blocked:
+                    self.fetch_stats.record_blocked()
+                    METRICS.inc('block_pages_total')
+                    print(f"Robot check page served for {url}, slowing down")
+                elif response.status_code == 304 and cached is not None:
+                    self.breaker.record_success()
+                    self.cache.refresh(cached)
+                    return cached['body']
+                elif response.status_code == 200:
+                    self.breaker.record_success()
+                    if self.archive is not None:
+                        self.archive.submit(response.text, url)
+                    if self.cache is not None:
+                        self.cache.put(url, self.headers, response.text,
+                                       response.headers.get('ETag'),
+                                       response.headers.get('Last-Modified'))
                     return response.text
                 else:
                     print(f"Failed to get page, status code: {response.status_code}")
-            except Exception as e:
-                print(f"Error fetching page (attempt {attempt+1}/{max_retries}): {e}")
-            
-            if attempt < max_retries - 1:
-                sleep_time = random.uniform(3, 7)
+                    if response.status_code not in self.RETRY_STATUS_CODES:
+                        break
+            except requests.RequestException as e:
+                self.fetch_stats.record_request(time.perf_counter() - started)
+                METRICS.observe('fetch_seconds', time.perf_counter() - started, status='error')
+                if self.rate_limiter is not None:
+                    self.rate_limiter.record(None)
+                print(f"Error fetching page (attempt {attempt+1}/{self.max_retries}): {e}")
+
+            if attempt < self.max_retries - 1:
+                if self.rate_limiter is not None:
+                    # The limiter has already slowed down and will pace the retry itself
+                    self.fetch_stats.record_retry(0.0)
+                    continue
+                sleep_time = self._backoff_delay(attempt, retry_after)
+                self.fetch_stats.record_retry(sleep_time)
                 print(f"Retrying in {sleep_time:.2f} seconds...")
                 time.sleep(sleep_time)
-        
+
+        self.fetch_stats.record_failure()
+        self.breaker.record_failure()
+        if self.breaker.is_open:
+            print(f"Too many consecutive failures, stopping search term '{self.search_term}'")
         return None
+
+    def _is_cached(self, url):
+        """Whether get_page would answer from the response cache without any network call"""
+        return self.cache is not None and self.cache.is_fresh(url, self.headers)
+
+    def host_scheduler(self, min_delay=2, max_delay=5):
+        """Scheduler every fetch path (serial, async, batch) paces this scraper's requests with"""
+        if self.rate_limiter is not None:
+            # The limiter spaces requests; the scheduler then only caps per-host concurrency
+            min_delay = max_delay = 0
+        return HostScheduler(self.per_host_limit, min_delay, max_delay)
+
+    def fetch_slot(self, url, scheduler, threaded=False):
+        """Context manager a fetch of url waits in before get_page; async unless threaded"""
+        if self._is_cached(url):
+            # Cached pages cost the host nothing, so they skip the politeness scheduler
+            return contextlib.nullcontext()
+        return scheduler.thread_slot(url) if threaded else scheduler.slot(url)
+
+    def _backoff_delay(self, attempt, retry_after=None):
+        """Exponential backoff with jitter, honouring Retry-After when the server sent one"""
+        if retry_after is not None:
+            return min(self.backoff_cap, retry_after) + random.uniform(0, 1)
+        delay = min(self.backoff_cap, self.backoff_base * (2 ** attempt))
+        return random.uniform(delay / 2, delay)
+
+    @staticmethod
+    def _parse_retry_after(value):
+        """Parse a Retry-After header given either as seconds or as an HTTP date"""
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=timezone.utc)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
     
     def extract_sponsored_products(self, html_content):
         """Extract sponsored products from the page"""
-        soup = BeautifulSoup(html_content, 'html.parser')
-        
         # Look for sponsored product listings
         sponsored_products = []
-        
-        # Debug: Save HTML to file for inspection
-        with open(f"amazon_page_debug_{int(time.time())}.html", "w", encoding="utf-8") as f:
-            f.write(html_content)
-        
+        timed = METRICS.enabled
+        started = time.perf_counter() if timed else 0.0
+
+        if self.card_memo is not None or self.streaming:
+            if self.card_memo is not None:
+                sponsored_products = self._extract_memoized(html_content)
+            else:
+                sponsored_products = list(self.iter_sponsored_products(html_content))
+            if timed:
+                METRICS.observe('parse_page_seconds', time.perf_counter() - started, backend=self.parser.name)
+                METRICS.inc('cards_sponsored_total', len(sponsored_products))
+            return sponsored_products
+
         # Search for products with sponsored tag
-        product_cards = soup.select('div[data-component-type="s-search-result"]')
+        product_cards = self.parser.cards(html_content)
         print(f"Found {len(product_cards)} product cards in total")
-        
+
+        sponsored_tags = 0
+        for card in product_cards:
+            card_started = time.perf_counter() if timed else 0.0
+            product, has_sponsored_tag = self._extract_card(card)
+            if timed:
+                METRICS.observe('parse_card_seconds', time.perf_counter() - card_started,
+                                backend=self.parser.name)
+            sponsored_tags += has_sponsored_tag
+            if product is not None:
+                sponsored_products.append(product)
+
         # Debug: look for sponsored labels
-        all_sponsored_tags = soup.select('span.s-label-popover-default .a-color-secondary')
-        print(f"Found {len(all_sponsored_tags)} sponsored tags")
+        print(f"Found {sponsored_tags} sponsored tags")
+        if timed:
+            METRICS.observe('parse_page_seconds', time.perf_counter() - started, backend=self.parser.name)
+            METRICS.inc('cards_seen_total', len(product_cards))
+            METRICS.inc('cards_sponsored_total', len(sponsored_products))
+            
+        return sponsored_products
+
+    def iter_sponsored_products(self, html_content):
+        """Yield sponsored products card by card, parsing only each card's markup"""
+        for fragment in iter_card_fragments(html_content):
+            METRICS.inc('cards_seen_total')
+            yield from self._extract_fragment(fragment)
+
+    def extract_into(self, html_content, batch):
+        """Add a page's sponsored products to a ProductBatch; returns how many were added.
+        In streaming mode each card's product goes into the batch as soon as it is extracted."""
+        if not self.streaming or self.card_memo is not None:
+            products = self.extract_sponsored_products(html_content)
+            batch.extend(products)
+            return len(products)
+
+        started = time.perf_counter() if METRICS.enabled else 0.0
+        before = len(batch)
+        batch.extend(self.iter_sponsored_products(html_content))
+        added = len(batch) - before
+        if METRICS.enabled:
+            METRICS.observe('parse_page_seconds', time.perf_counter() - started, backend=self.parser.name)
+            METRICS.inc('cards_sponsored_total', added)
+        return added
+
+    def _extract_fragment(self, fragment):
+        """Sponsored products in one card's raw markup"""
+        products = []
+        for card in self.parser.cards(fragment):
+            product, _ = self._extract_card(card)
+            if product is not None:
+                products.append(product)
+        return products
+
+    def _memo_lookup(self, html_content):
+        """Fingerprint every card on the page and look it up in the card memo.
+        Returns (fingerprints, memoized products or None per card, markup of the misses)"""
+        keys, cached, missing = [], [], []
+        for fragment in iter_card_fragments(html_content):
+            # Counted here, before the lookup, so memo hits are counted as seen cards too
+            METRICS.inc('cards_seen_total')
+            key = self.card_memo.fingerprint(fragment, self.base_url)
+            products = self.card_memo.get(key)
+            keys.append(key)
+            cached.append(products)
+            if products is None:
+                missing.append(fragment)
+        return keys, cached, missing
+
+    def _memo_complete(self, keys, cached, extracted):
+        """Memoize the products extracted for the misses and return the page's products in order"""
+        extracted = iter(extracted)
+        products = []
+        for key, hit in zip(keys, cached):
+            if hit is None:
+                hit = self.card_memo.put(key, next(extracted))
+            products.extend(hit)
+        return products
+
+    def _extract_memoized(self, html_content):
+        keys, cached, missing = self._memo_lookup(html_content)
+        return self._memo_complete(keys, cached, [self._extract_fragment(fragment) for fragment in missing])
+
+    def _extract_card(self, card):
+        """Extract one product card, returning (product or None, has sponsored tag)"""
+        parser = self.parser
+
+        # Multiple ways to identify sponsored products - try different methods
+        sponsored_tag = parser.select_one(card, 'sponsored_tag')
+        sponsored_in_attrs = False
         
-        for card in product_cards:
-            # Multiple ways to identify sponsored products - try different methods
-            sponsored_tag = card.select_one('span.s-label-popover-default .a-color-secondary')
-            sponsored_in_attrs = False
+        # Check if "sponsored" appears in any data attributes
+        for attr_name, attr_value in parser.attrs(card).items():
+            if isinstance(attr_value, str) and 'sponsor' in attr_value.lower():
+                sponsored_in_attrs = True
+                break
+                
+        # Check for other potential sponsored indicators
+        alt_sponsored_tag = parser.select_one(card, 'alt_sponsored_tag')
+        
+        if (sponsored_tag is None or 'Sponsored' not in parser.text(sponsored_tag)) and \
+           not sponsored_in_attrs and alt_sponsored_tag is None:
+            return None, sponsored_tag is not None
             
-            # Check if "sponsored" appears in any data attributes
-            for attr_name, attr_value in card.attrs.items():
-                if isinstance(attr_value, str) and 'sponsor' in attr_value.lower():
-                    sponsored_in_attrs = True
-                    break
-                    
-            # Check for other potential sponsored indicators
-            alt_sponsored_tag = card.select_one('.puis-sponsored-label-text')
+        try:
+            # Extract product details
+            title_element = parser.select_one(card, 'title')
+            title = parser.text(title_element) if title_element is not None else "N/A"
             
-            if (not sponsored_tag or 'Sponsored' not in sponsored_tag.get_text(strip=True)) and \
-               not sponsored_in_attrs and not alt_sponsored_tag:
-                continue
-                
-            try:
-                # Extract product details
-                title_element = card.select_one('h2 a.a-link-normal span')
-                title = title_element.get_text(strip=True) if title_element else "N/A"
-                
-                # Get Product URL
-                product_link_element = card.select_one('h2 a.a-link-normal')
-                product_url = self.base_url + product_link_element.get('href') if product_link_element else "N/A"
-                
-                # Extract brand
-                brand_element = card.select_one('.a-size-base.a-color-secondary')
-                brand = brand_element.get_text(strip=True) if brand_element else "N/A"
-                if brand == "N/A":
-                    # Try alternate brand location
-                    brand_element = card.select_one('h5 .a-size-base')
-                    brand = brand_element.get_text(strip=True) if brand_element else "N/A"
-                
-                # Extract rating
-                rating_element = card.select_one('i.a-icon-star-small span')
-                rating_text = rating_element.get_text(strip=True) if rating_element else "N/A"
-                rating = rating_text.split(' ')[0] if rating_text != "N/A" else "N/A"
-                
-                # Extract review count
-                reviews_element = card.select_one('span.a-size-base.s-underline-text')
-                reviews = reviews_element.get_text(strip=True) if reviews_element else "0"
-                
-                # Extract price
-                price_element = card.select_one('.a-price-whole')
-                price = price_element.get_text(strip=True) if price_element else "N/A"
-                if price != "N/A":
-                    price = "₹" + price
-                
-                # Extract image URL
-                img_element = card.select_one('img.s-image')
-                img_url = img_element.get('src') if img_element else "N/A"
-                
-                # Create product dictionary
-                product = {
-                    'product_title': title,
-                    'brand': brand,
-                    'rating': rating,
-                    'num_reviews': reviews,
-                    'selling_price': price,
-                    'image_url': img_url,
-                    'product_url': product_url
-                }
-                
-                sponsored_products.append(product)
-                
-            except Exception as e:
-                print(f"Error extracting product info: {e}")
-                continue
+            # Get Product URL
+            product_link_element = parser.select_one(card, 'product_link')
+            product_url = self.base_url + parser.attr(product_link_element, 'href') if product_link_element is not None else "N/A"
             
-        return sponsored_products
+            # Extract brand
+            brand_element = parser.select_one(card, 'brand')
+            brand = parser.text(brand_element) if brand_element is not None else "N/A"
+            if brand == "N/A":
+                # Try alternate brand location
+                brand_element = parser.select_one(card, 'alt_brand')
+                brand = parser.text(brand_element) if brand_element is not None else "N/A"
+            
+            # Extract rating
+            rating_element = parser.select_one(card, 'rating')
+            rating_text = parser.text(rating_element) if rating_element is not None else "N/A"
+            rating = rating_text.split(' ')[0] if rating_text != "N/A" else "N/A"
+            
+            # Extract review count
+            reviews_element = parser.select_one(card, 'reviews')
+            reviews = parser.text(reviews_element) if reviews_element is not None else "0"
+            
+            # Extract price
+            price_element = parser.select_one(card, 'price')
+            price = parser.text(price_element) if price_element is not None else "N/A"
+            if price != "N/A":
+                price = "₹" + price
+            
+            # Extract image URL
+            img_element = parser.select_one(card, 'image')
+            img_url = parser.attr(img_element, 'src') if img_element is not None else "N/A"
+            
+            # Create product record
+            product = ProductRecord(title, brand, rating, reviews, price, img_url, product_url)
+            
+        except Exception as e:
+            print(f"Error extracting product info: {e}")
+            return None, sponsored_tag is not None
+            
+        return product, sponsored_tag is not None
     
-    def scrape(self):
+    def scrape(self, concurrent=False):
         """Main scraping function to go through all pages"""
-        all_products = []
-        
+        if concurrent:
+            return asyncio.run(self.scrape_async())
+
+        all_products = ProductBatch()
+        scheduler = self.host_scheduler()
+
         for page in range(1, self.num_pages + 1):
             print(f"Scraping page {page}...")
             url = self.search_url(page)
-            html_content = self.get_page(url)
+            # Random spacing between page requests to avoid being blocked
+            with self.fetch_slot(url, scheduler, threaded=True):
+                html_content = self.get_page(url)
             
+            if self.breaker.is_open:
+                break
+
             if not html_content:
                 print(f"Failed to get content for page {page}, skipping.")
                 continue
                 
-            products = self.extract_sponsored_products(html_content)
-            print(f"Found {len(products)} sponsored products on page {page}")
-            all_products.extend(products)
-            
-            # Random sleep between page requests to avoid being blocked
-            if page < self.num_pages:
-                sleep_time = random.uniform(2, 5)
-                print(f"Waiting {sleep_time:.2f} seconds before next page...")
-                time.sleep(sleep_time)
+            found = self.extract_into(html_content, all_products)
+            print(f"Found {found} sponsored products on page {page}")
         
         self.products = all_products
         return all_products
+
+    async def scrape_async(self, min_delay=2, max_delay=5):
+        """Fetch all pages concurrently, keeping products in page order"""
+        scheduler = self.host_scheduler(min_delay, max_delay)
+        in_flight = asyncio.Semaphore(self.max_in_flight)
+        loop = asyncio.get_running_loop()
+
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as executor:
+            async def fetch(page):
+                url = self.search_url(page)
+                async with in_flight, self.fetch_slot(url, scheduler):
+                    print(f"Scraping page {page}...")
+                    return await loop.run_in_executor(executor, self.get_page, url)
+
+            pages = list(range(1, self.num_pages + 1))
+            html_pages = await asyncio.gather(*(fetch(page) for page in pages))
+
+        all_products = ProductBatch()
+        for page, html_content in zip(pages, html_pages):
+            if not html_content:
+                print(f"Failed to get content for page {page}, skipping.")
+                continue
+
+            found = self.extract_into(html_content, all_products)
+            print(f"Found {found} sponsored products on page {page}")
+
+        self.products = all_products
+        return all_products
     
-    def save_to_csv(self, filename='amazon_sponsored_products.csv'):
-        """Save scraped products to CSV"""
+    def save_to_csv(self, filename='amazon_sponsored_products.csv', file_format='csv', crawl_id=None):
+        """Save scraped products to CSV, or append them to a Parquet dataset tagged with crawl_id"""
+        filename = with_storage_suffix(filename, file_format)
         if not self.products:
             print("No products to save.")
-            # Create empty DataFrame with proper columns to avoid errors
-            empty_df = pd.DataFrame(columns=[
-                'product_title', 'brand', 'rating', 'num_reviews', 
-                'selling_price', 'image_url', 'product_url'
-            ])
-            empty_df.to_csv(filename, index=False)
-            print(f"Created empty CSV file: {filename}")
+            # Write just the header so later stages still see the columns
+            if file_format == 'csv':
+                ProductBatch().to_csv(filename)
+            else:
+                save_products(ProductBatch().to_dataframe(), filename, file_format,
+                              search_term=self.search_term, crawl_id=crawl_id)
+            print(f"Created empty {file_format.upper()} output: {filename}")
             return filename
             
-        df = pd.DataFrame(self.products)
-        df.to_csv(filename, index=False)
+        products = self.products if isinstance(self.products, ProductBatch) else ProductBatch(self.products)
+        if file_format == 'csv':
+            products.to_csv(filename)
+        else:
+            save_products(products.to_dataframe(), filename, file_format, search_term=self.search_term,
+                          crawl_id=crawl_id)
         print(f"Saved {len(self.products)} products to {filename}")
         return filename
 
+# One parsing scraper per worker process, so the process pool does not rebuild it per page
+_parse_scrapers = {}
+
+def parse_page(html_content, base_url="https://www.amazon.in", parser_backend='bs4', streaming=False):
+    """Extract sponsored products from a page; picklable entry point for process pools"""
+    key = (base_url, parser_backend, streaming)
+    if key not in _parse_scrapers:
+        _parse_scrapers[key] = AmazonSponsoredScraper('', base_url=base_url,
+                                                      parser_backend=parser_backend,
+                                                      streaming=streaming)
+    return _parse_scrapers[key].extract_sponsored_products(html_content)
+
+def parse_fragments(fragments, base_url="https://www.amazon.in", parser_backend='bs4'):
+    """Extract each card's products from its raw markup; picklable entry point for process pools"""
+    key = (base_url, parser_backend, True)
+    if key not in _parse_scrapers:
+        _parse_scrapers[key] = AmazonSponsoredScraper('', base_url=base_url,
+                                                      parser_backend=parser_backend,
+                                                      streaming=True)
+    return [_parse_scrapers[key]._extract_fragment(fragment) for fragment in fragments]
+
+class BatchCrawler:
+    """Crawl many search terms through a shared (term, page) job queue"""
+    def __init__(self, search_terms, num_pages=3, io_workers=8, parse_workers=None,
+                 journal_path='batch_journal.jsonl', min_delay=2, max_delay=5, **scraper_kwargs):
+        self.search_terms = list(dict.fromkeys(search_terms))
+        self.num_pages = num_pages
+        self.io_workers = io_workers
+        self.parse_workers = parse_workers
+        self.journal_path = journal_path
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.scrapers = {term: AmazonSponsoredScraper(term, num_pages, **scraper_kwargs)
+                         for term in self.search_terms}
+        # Every I/O worker goes through one scheduler, so terms on the same host share its limits;
+        # the scrapers are built from the same kwargs, so any of them can make it
+        self.scheduler = (self.scrapers[self.search_terms[0]].host_scheduler(min_delay, max_delay)
+                          if self.search_terms else None)
+        self.results = {}
+        self.products = ProductBatch(extra_columns=['search_term'])
+        self._journal_lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        """Build a crawler from a keyword file with one search term per line"""
+        with open(path, encoding="utf-8") as f:
+            terms = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+        return cls(terms, **kwargs)
+
+    def _load_journal(self):
+        """Load results of jobs finished by a previous (possibly crashed) run"""
+        if not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A crash mid-write leaves a truncated last line; that job is simply redone
+                    continue
+                if record['status'] == 'ok':
+                    record['products'] = [ProductRecord.from_dict(product) for product in record['products']]
+                    self.results[(record['search_term'], record['page'])] = record
+
+    def _record(self, record):
+        """Append a job report to the journal and keep it in memory"""
+        with self._journal_lock:
+            with open(self.journal_path, 'a', encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False, default=ProductRecord.to_dict) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            if record['status'] == 'ok':
+                self.results[(record['search_term'], record['page'])] = record
+        print(f"[{record['search_term']!r} page {record['page']}] {record['status']}: "
+              f"{record['num_products']} products, fetch {record['fetch_seconds']:.2f}s")
+
+    def _io_worker(self, jobs, parse_pool, pending):
+        """Fetch pages from the shared queue and hand the HTML to the parse pool"""
+        while True:
+            job = jobs.get()
+            if job is None:
+                jobs.task_done()
+                return
+
+            term, page = job
+            scraper = self.scrapers[term]
+            record = {'search_term': term, 'page': page, 'num_products': 0,
+                      'fetch_seconds': 0.0, 'products': []}
+            if scraper.breaker.is_open:
+                record['status'] = 'skipped'
+                self._record(record)
+                jobs.task_done()
+                continue
+
+            url = scraper.search_url(page)
+            started = time.perf_counter()
+            with scraper.fetch_slot(url, self.scheduler, threaded=True):
+                html_content = scraper.get_page(url)
+            record['fetch_seconds'] = time.perf_counter() - started
+
+            if not html_content:
+                record['status'] = 'fetch_failed'
+                self._record(record)
+            elif scraper.card_memo is not None:
+                # Only the cards the memo has not seen go to the parse pool
+                keys, cached, missing = scraper._memo_lookup(html_content)
+                future = parse_pool.submit(parse_fragments, missing, scraper.base_url, scraper.parser.name)
+                memo_page = (scraper, keys, cached)
+                future.add_done_callback(
+                    lambda f, record=record, memo_page=memo_page: self._on_parsed(f, record, memo_page))
+                pending.append(future)
+            else:
+                future = parse_pool.submit(parse_page, html_content, scraper.base_url,
+                                          scraper.parser.name, scraper.streaming)
+                future.add_done_callback(lambda f, record=record: self._on_parsed(f, record))
+                pending.append(future)
+
+            jobs.task_done()
+
+    def _on_parsed(self, future, record, memo_page=None):
+        try:
+            products = future.result()
+            if memo_page is not None:
+                scraper, keys, cached = memo_page
+                products = scraper._memo_complete(keys, cached, products)
+        except Exception as e:
+            print(f"Error parsing {record['search_term']!r} page {record['page']}: {e}")
+            record['status'] = 'parse_failed'
+        else:
+            record['status'] = 'ok'
+            record['num_products'] = len(products)
+            record['products'] = products
+        self._record(record)
+
+    def run(self):
+        """Run every (term, page) job not already completed in the journal"""
+        self._load_journal()
+        jobs = queue.Queue()
+        for term in self.search_terms:
+            for page in range(1, self.num_pages + 1):
+                if (term, page) not in self.results:
+                    jobs.put((term, page))
+        print(f"Batch: {len(self.search_terms)} search terms, {jobs.qsize()} jobs to run, "
+              f"{len(self.results)} already done")
+
+        pending = []
+        # The pool starts its workers on the first submit, from an I/O thread while the others
+        # run; a plain fork there can copy a lock another thread holds, so fork from a server
+        start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        with ProcessPoolExecutor(max_workers=self.parse_workers,
+                                 mp_context=multiprocessing.get_context(start_method)) as parse_pool:
+            workers = [threading.Thread(target=self._io_worker, args=(jobs, parse_pool, pending))
+                       for _ in range(self.io_workers)]
+            for worker in workers:
+                jobs.put(None)
+                worker.start()
+            for worker in workers:
+                worker.join()
+        # Leaving the pool context waits for every parse, so all callbacks have run
+
+        if len(self.results) == len(self.search_terms) * self.num_pages and os.path.exists(self.journal_path):
+            # Every job succeeded: keep the journal for reference, but never resume from it again
+            os.replace(self.journal_path, f"{self.journal_path}.done")
+
+        # Collect products in term and page order
+        self.products = ProductBatch(extra_columns=['search_term'])
+        for term in self.search_terms:
+            for page in range(1, self.num_pages + 1):
+                record = self.results.get((term, page))
+                if record:
+                    self.products.extend(record['products'], search_term=term)
+        return self.products
+
+    def summary(self):
+        """Per search term job counts, useful to spot terms that need a rerun"""
+        return {term: {'pages_done': sum(1 for page in range(1, self.num_pages + 1)
+                                         if (term, page) in self.results),
+                       'products': sum(len(self.results[(term, page)]['products'])
+                                       for page in range(1, self.num_pages + 1)
+                                       if (term, page) in self.results)}
+                for term in self.search_terms}
+
+    def save_to_csv(self, filename='amazon_sponsored_products.csv', file_format='csv', crawl_id=None):
+        """Save batch products to CSV, or append them to a Parquet dataset tagged with crawl_id"""
+        filename = with_storage_suffix(filename, file_format)
+        if file_format == 'csv':
+            self.products.to_csv(filename)
+        else:
+            save_products(self.products.to_dataframe(), filename, file_format, crawl_id=crawl_id)
+        print(f"Saved {len(self.products)} products to {filename}")
+        return filename
+
+# Columnar storage. Parquet datasets are directories partitioned by search term
+# and crawl date; every save adds new files, so saving again appends. Raw rows
+# carry the id of the run that saved them, so a run can read back only its own.
+PRODUCT_COLUMNS = ['product_title', 'brand', 'rating', 'num_reviews',
+                   'selling_price', 'image_url', 'product_url']
+PARTITION_COLUMNS = ['search_term', 'crawl_date']
+
+def _require_pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Parquet storage needs: pip install pyarrow") from e
+    return pa, ds, pq
+
+def product_schema(cleaned):
+    """Arrow schema for raw (all text) or cleaned (typed) product rows"""
+    pa, _, _ = _require_pyarrow()
+    if cleaned:
+        fields = [('product_title', pa.string()),
+                  # Few distinct brands repeat across many rows, so store them dictionary-encoded
+                  ('brand', pa.dictionary(pa.int32(), pa.string())),
+                  ('rating', pa.float64()),
+                  ('num_reviews', pa.int64()),
+                  ('selling_price', pa.float64()),
+                  ('image_url', pa.string()),
+                  ('product_url', pa.string())]
+    else:
+        fields = [(name, pa.string()) for name in PRODUCT_COLUMNS + ['crawl_id']]
+    return pa.schema(fields + [(name, pa.string()) for name in PARTITION_COLUMNS])
+
+def storage_format(path):
+    """'parquet' for .parquet paths and dataset directories, otherwise 'csv'"""
+    return 'parquet' if path.endswith('.parquet') or os.path.isdir(path) else 'csv'
+
+def with_storage_suffix(path, file_format):
+    """Swap a default .csv file name for the matching parquet dataset name"""
+    if file_format == 'parquet' and path.endswith('.csv'):
+        return path[:-len('.csv')] + '.parquet'
+    return path
+
+def save_products(df, path, file_format='csv', cleaned=False, search_term=None, crawl_date=None,
+                  append=True, crawl_id=None):
+    """Write product rows as CSV, or add them to a partitioned Parquet dataset"""
+    if file_format == 'csv':
+        df.to_csv(path, index=False)
+        return path
+
+    pa, _, pq = _require_pyarrow()
+    if not append and os.path.isdir(path):
+        shutil.rmtree(path)
+    df = df.copy()
+    if 'search_term' not in df:
+        df['search_term'] = search_term or 'unknown'
+    df['search_term'] = df['search_term'].fillna(search_term or 'unknown')
+    if 'crawl_date' not in df:
+        df['crawl_date'] = crawl_date or datetime.now().strftime('%Y-%m-%d')
+    if crawl_id is not None:
+        df['crawl_id'] = crawl_id
+
+    schema = product_schema(cleaned)
+    schema = pa.schema([field for field in schema if field.name in df.columns])
+    # Cleaning can leave an all-missing column as object None; Arrow reads that as null
+    table = pa.Table.from_pandas(df[schema.names], schema=schema, preserve_index=False)
+    os.makedirs(path, exist_ok=True)
+    pq.write_to_dataset(table, path, partition_cols=PARTITION_COLUMNS,
+                        basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+                        existing_data_behavior='overwrite_or_ignore')
+    return path
+
+def _parquet_dataset(path, crawl_id=None):
+    """The dataset at path and the row filter to read it with: only crawl_id's rows when given"""
+    pa, ds, _ = _require_pyarrow()
+    partitioning = ds.partitioning(pa.schema([(name, pa.string()) for name in PARTITION_COLUMNS]),
+                                   flavor='hive')
+    if crawl_id is None:
+        return ds.dataset(path, format='parquet', partitioning=partitioning), None
+    # The raw schema reads files saved before crawl ids existed as a null crawl_id
+    dataset = ds.dataset(path, format='parquet', partitioning=partitioning,
+                         schema=product_schema(cleaned=False))
+    return dataset, ds.field('crawl_id') == crawl_id
+
+def _apply_dtypes(df, dtype):
+    """Cast the columns named in dtype, so Parquet rows come out typed like CSV rows"""
+    if not dtype:
+        return df
+    return df.astype({column: kind for column, kind in dtype.items() if column in df.columns})
+
+def load_products(path, columns=None, dtype=None, crawl_id=None):
+    """Read product rows from CSV or a Parquet dataset, reading only `columns` when given.
+    With crawl_id, a raw Parquet dataset yields only the rows that crawl saved."""
+    if storage_format(path) == 'csv':
+        return pd.read_csv(path, usecols=columns, dtype=dtype)
+
+    dataset, row_filter = _parquet_dataset(path, crawl_id)
+    if not dataset.files:
+        return _apply_dtypes(pd.DataFrame(columns=columns or PRODUCT_COLUMNS), dtype)
+    return _apply_dtypes(dataset.to_table(columns=columns, filter=row_filter).to_pandas(), dtype)
+
+def iter_product_chunks(path, chunksize, dtype=None, crawl_id=None):
+    """Yield product rows from CSV or a Parquet dataset in DataFrames of at most chunksize rows"""
+    if storage_format(path) == 'csv':
+        yield from pd.read_csv(path, chunksize=chunksize, dtype=dtype)
+        return
+    dataset, row_filter = _parquet_dataset(path, crawl_id)
+    for batch in dataset.to_batches(batch_size=chunksize, filter=row_filter):
+        if batch.num_rows:
+            yield _apply_dtypes(batch.to_pandas(), dtype)
+
+# ASINs are 10 character product ids; sponsored links wrap the product path in a url-encoded redirect
+_ASIN_RE = re.compile(r'/(?:dp|gp/product|gp/aw/d)/([A-Z0-9]{10})(?:[/?&]|$)')
+
+def parse_asin(product_url):
+    """Return the ASIN in a product URL, or None"""
+    if not isinstance(product_url, str):
+        return None
+    match = _ASIN_RE.search(unquote(product_url))
+    return match.group(1) if match else None
+
+class HistoryStore:
+    """SQLite store of crawl observations keyed by ASIN, for price and rating history"""
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS products (
+            asin TEXT PRIMARY KEY,
+            product_title TEXT,
+            brand TEXT,
+            image_url TEXT,
+            product_url TEXT,
+            first_seen TEXT NOT NULL,
+            last_seen TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS observations (
+            asin TEXT NOT NULL REFERENCES products(asin),
+            observed_at TEXT NOT NULL,
+            search_term TEXT NOT NULL DEFAULT '',
+            rating REAL,
+            num_reviews INTEGER,
+            selling_price REAL,
+            PRIMARY KEY (asin, observed_at, search_term)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_products_first_seen ON products(first_seen);
+        CREATE INDEX IF NOT EXISTS idx_observations_observed_at ON observations(observed_at);
+    """
+
+    def __init__(self, path='amazon_history.db'):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.SCHEMA)
+
+    @staticmethod
+    def _value(value):
+        """SQLite wants None for missing values, not NaN"""
+        return None if pd.isna(value) else value
+
+    def record_crawl(self, df, observed_at=None, search_term=None):
+        """Upsert each product of a cleaned crawl and add one timestamped observation per product"""
+        observed_at = observed_at or datetime.now().isoformat(timespec='seconds')
+        products = []
+        observations = []
+        skipped = 0
+        for row in df.itertuples(index=False):
+            row = row._asdict()
+            asin = parse_asin(row.get('product_url'))
+            if asin is None:
+                skipped += 1
+                continue
+            term = row.get('search_term')
+            term = search_term if self._value(term) is None else term
+            products.append((asin, self._value(row.get('product_title')), self._value(row.get('brand')),
+                             self._value(row.get('image_url')), row['product_url'],
+                             observed_at, observed_at))
+            observations.append((asin, observed_at, term or '',
+                                 self._value(row.get('rating')), self._value(row.get('num_reviews')),
+                                 self._value(row.get('selling_price'))))
+
+        with self.conn:
+            self.conn.executemany("""
+                INSERT INTO products (asin, product_title, brand, image_url, product_url, first_seen, last_seen)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(asin) DO UPDATE SET
+                    product_title = excluded.product_title,
+                    brand = excluded.brand,
+                    image_url = excluded.image_url,
+                    product_url = excluded.product_url,
+                    first_seen = min(products.first_seen, excluded.first_seen),
+                    last_seen = max(products.last_seen, excluded.last_seen)
+            """, products)
+            self.conn.executemany("""
+                INSERT OR REPLACE INTO observations
+                    (asin, observed_at, search_term, rating, num_reviews, selling_price)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, observations)
+
+        print(f"Recorded {len(observations)} observations in {self.path}"
+              + (f" ({skipped} rows without an ASIN skipped)" if skipped else ""))
+        return len(observations)
+
+    def price_history(self, asin):
+        """Observations of one ASIN, oldest first"""
+        return pd.read_sql_query("""
+            SELECT observed_at, search_term, selling_price, rating, num_reviews
+            FROM observations WHERE asin = ? ORDER BY observed_at
+        """, self.conn, params=(asin,))
+
+    def new_products_since(self, since):
+        """Products first seen at or after `since` (a datetime or ISO timestamp)"""
+        if isinstance(since, datetime):
+            since = since.isoformat(timespec='seconds')
+        return pd.read_sql_query("""
+            SELECT asin, product_title, brand, product_url, first_seen
+            FROM products WHERE first_seen >= ? ORDER BY first_seen
+        """, self.conn, params=(since,))
+
+    def close(self):
+        self.conn.close()
+
 class DataCleaner:
-    def __init__(self, filepath):
+    # Explicit dtypes for raw reads, so the whole file and every chunk parse the same
+    # way whatever values happen to land in them
+    RAW_DTYPES = {
+        'product_title': 'str', 'brand': 'str', 'rating': 'str', 'num_reviews': 'str',
+        'selling_price': 'str', 'image_url': 'str', 'product_url': 'str', 'search_term': 'str',
+    }
+    DEDUP_COLUMNS = ['product_title', 'brand']
+
+    def __init__(self, filepath, chunksize=None, crawl_id=None):
         self.filepath = filepath
-        self.df = pd.read_csv(filepath)
+        self.chunksize = chunksize
+        # A raw Parquet dataset holds every earlier crawl too; only this one's rows get cleaned
+        self.crawl_id = crawl_id
+        # In chunked mode the raw file is never loaded whole; see clean_chunked
+        self.df = load_products(filepath, dtype=self.RAW_DTYPES, crawl_id=crawl_id) \
+            if chunksize is None else None
         self.cleaned_filepath = None
+
+    @classmethod
+    def from_dataframe(cls, df, filepath=None):
+        """Build a cleaner around an already loaded raw DataFrame"""
+        cleaner = cls.__new__(cls)
+        cleaner.filepath = filepath
+        cleaner.crawl_id = None
+        cleaner.df = df
+        cleaner.cleaned_filepath = None
+        return cleaner
         
-    def clean(self):
+    def clean(self, vectorized=True):
         """Clean the data"""
+        started = time.perf_counter()
         # Make a copy to avoid modifying original
         df = self.df.copy()
         
         # Remove duplicates
         original_count = len(df)
-        df.drop_duplicates(subset=['product_title', 'brand'], inplace=True)
+        df.drop_duplicates(subset=self.DEDUP_COLUMNS, inplace=True)
         print(f"Removed {original_count - len(df)} duplicate products")
-        
-        # Clean price column
-        df['selling_price'] = df['selling_price'].apply(self._clean_price)
-        
-        # Clean ratings
-        df['rating'] = df['rating'].apply(self._clean_rating)
-        
-        # Clean review count
-        df['num_reviews'] = df['num_reviews'].apply(self._clean_reviews)
-        
-        # Clean brand
-        df['brand'] = df['brand'].apply(lambda x: x.strip() if isinstance(x, str) else x)
-        
-        # Handle missing values
-        for col in ['brand', 'product_title']:
-            df[col] = df[col].fillna('Unknown')
+
+        self._clean_columns(df, vectorized)
             
         # Set the cleaned dataframe
         self.df = df
+        self._record_clean_metrics(original_count, time.perf_counter() - started)
         return df
+
+    @staticmethod
+    def _record_clean_metrics(rows, seconds):
+        METRICS.observe('clean_seconds', seconds)
+        METRICS.inc('clean_rows_total', rows)
+        METRICS.set('clean_rows_per_second', round(rows / seconds, 1) if seconds else 0.0)
+
+    def clean_chunked(self, filename=None, chunksize=None, vectorized=True, file_format=None):
+        """Clean the raw data chunk by chunk, appending each cleaned chunk to the output"""
+        chunksize = chunksize or self.chunksize or 100_000
+        file_format = file_format or storage_format(self.filepath)
+        filename = filename or with_storage_suffix(self._default_cleaned_filename(), file_format)
+        if os.path.isdir(filename):
+            shutil.rmtree(filename)
+        elif os.path.exists(filename):
+            os.remove(filename)
+
+        # 64-bit hashes of (product_title, brand) seen so far; memory grows with
+        # the number of distinct products, not with the file or chunk size
+        seen_keys = set()
+        total_rows = kept_rows = 0
+        for chunk in iter_product_chunks(self.filepath, chunksize, dtype=self.RAW_DTYPES,
+                                         crawl_id=self.crawl_id):
+            started = time.perf_counter()
+            total_rows += len(chunk)
+            keys = pd.util.hash_pandas_object(chunk[self.DEDUP_COLUMNS], index=False).to_numpy()
+            keep = ~pd.Series(keys).duplicated().to_numpy()
+            if seen_keys:
+                keep &= ~np.fromiter((key in seen_keys for key in keys), dtype=bool, count=len(keys))
+            seen_keys.update(keys[keep].tolist())
+
+            chunk = chunk[keep].copy()
+            self._clean_columns(chunk, vectorized)
+            if file_format == 'csv':
+                chunk.to_csv(filename, mode='a', header=(kept_rows == 0), index=False)
+            else:
+                save_products(chunk, filename, file_format, cleaned=True)
+            kept_rows += len(chunk)
+            self._record_clean_metrics(int(keep.size), time.perf_counter() - started)
+
+        if total_rows == 0 and file_format == 'csv':
+            # Keep the header so downstream readers still see the columns
+            load_products(self.filepath).head(0).to_csv(filename, index=False)
+
+        print(f"Removed {total_rows - kept_rows} duplicate products")
+        self.cleaned_filepath = filename
+        print(f"Cleaned data saved to {filename}")
+        return filename
+
+    def _clean_columns(self, df, vectorized=True):
+        """Clean the price, rating, review and brand columns of df in place"""
+        # An empty frame keeps its input dtypes under apply, so it takes the row-wise path
+        if vectorized and not df.empty:
+            df['selling_price'] = self._clean_by_uniques(df['selling_price'], self._clean_price_column)
+            df['rating'] = self._clean_by_uniques(df['rating'], self._clean_rating_column, missing=None)
+            df['num_reviews'] = self._clean_by_uniques(df['num_reviews'], self._clean_reviews_column, missing=0)
+            df['brand'] = self._clean_by_uniques(df['brand'], self._clean_brand_column)
+        else:
+            # Clean price column
+            df['selling_price'] = df['selling_price'].apply(self._clean_price)
+            
+            # Clean ratings
+            df['rating'] = df['rating'].apply(self._clean_rating)
+            
+            # Clean review count
+            df['num_reviews'] = df['num_reviews'].apply(self._clean_reviews)
+            
+            # Clean brand
+            df['brand'] = df['brand'].apply(lambda x: x.strip() if isinstance(x, str) else x)
+        
+        # Handle missing values
+        for col in ['brand', 'product_title']:
+            df[col] = df[col].fillna('Unknown')
     
+    # Vectorized equivalents of the row-wise _clean_* functions below. They must
+    # give identical results, including for values that are not strings.
+    _PRICE_JUNK = r'[₹,\s]'
+    _NON_DIGITS = r'[^\d]'
+
+    @staticmethod
+    def _python_regex(strings):
+        """Strings as object dtype, so .str.replace runs Python's re like the row-wise path.
+        Arrow-backed strings use RE2, where \\d and \\s are ASCII only and miss
+        Devanagari digits and no-break spaces."""
+        return strings.astype(object)
+
+    _PASS_THROUGH = object()
+
+    @staticmethod
+    def _string_mask(col):
+        """True where the value is a str; .str methods return NaN for anything else"""
+        try:
+            return col.str.len().notna()
+        except AttributeError:
+            # .str refuses columns holding no strings at all
+            return pd.Series(False, index=col.index)
+
+    def _clean_by_uniques(self, col, clean_column, missing=_PASS_THROUGH):
+        """Clean each distinct value once and broadcast the results back by position.
+
+        Prices, ratings, review counts and brands repeat heavily across rows, so
+        cleaning the factorized uniques is far cheaper than cleaning every row.
+        Missing values get `missing`, or keep their original value by default.
+        """
+        codes, uniques = pd.factorize(col)
+        cleaned = clean_column(pd.Series(uniques)).to_numpy(dtype=object)
+        # Missing values are coded -1, which picks the trailing placeholder
+        values = np.append(cleaned, None)[codes]
+        is_missing = codes == -1
+        if is_missing.any():
+            if missing is self._PASS_THROUGH:
+                values[is_missing] = col.to_numpy(dtype=object)[is_missing]
+            else:
+                values[is_missing] = missing
+        result = pd.Series(values, index=col.index, dtype=object)
+        # Series.apply gives an object column only when every result is None; a missing
+        # value passed through as NaN makes it float64, as do parsed numbers
+        if len(result) and all(value is None for value in values):
+            return result
+        return result.infer_objects()
+
+    @staticmethod
+    def _to_number(strings, convert):
+        """pd.to_numeric, falling back to `convert` (float or int) for whatever it rejects.
+        Python's parsers also accept forms pandas does not, such as '1_000' or
+        Devanagari digits, so those take the slow path to match the row-wise cleaning."""
+        numbers = pd.to_numeric(strings, errors='coerce').astype('float64')
+        retry = numbers.isna()
+        if retry.any():
+            fallback = []
+            for value in strings[retry]:
+                try:
+                    fallback.append(convert(value))
+                except ValueError:
+                    fallback.append(float('nan'))
+            numbers[retry] = fallback
+        return numbers
+
+    @staticmethod
+    def _as_applied(result):
+        """Match the dtype Series.apply infers: all-None results stay object, strings become str"""
+        if len(result) and result.isna().all():
+            return pd.Series([None] * len(result), index=result.index, dtype=object)
+        if result.dtype == object:
+            return result.infer_objects()
+        return result
+
+    def _clean_price_column(self, col):
+        """Vectorized _clean_price"""
+        is_str = self._string_mask(col)
+        if not is_str.any():
+            return col
+        stripped = self._python_regex(col[is_str]).str.replace(self._PRICE_JUNK, '', regex=True)
+        cleaned = self._to_number(stripped, float)
+        if is_str.all():
+            return self._as_applied(cleaned)
+        # Non-string values pass through unchanged, exactly as in _clean_price
+        result = col.astype(object)
+        result[is_str] = cleaned
+        return self._as_applied(result)
+
+    def _clean_rating_column(self, col):
+        """Vectorized _clean_rating"""
+        is_str = self._string_mask(col) & (col != "N/A")
+        result = pd.Series(float('nan'), index=col.index, dtype='float64')
+        if is_str.any():
+            first_token = col[is_str].str.split(' ', n=1).str[0]
+            result[is_str] = self._to_number(first_token, float)
+        return self._as_applied(result)
+
+    def _clean_reviews_column(self, col):
+        """Vectorized _clean_reviews"""
+        is_str = self._string_mask(col)
+        result = pd.Series(0, index=col.index, dtype='int64')
+        if is_str.any():
+            digits = self._python_regex(col[is_str]).str.replace(self._NON_DIGITS, '', regex=True)
+            # \d also matches non-ASCII digits, which int() reads and pandas does not
+            result[is_str] = self._to_number(digits.where(digits != '', '0'), int).astype('int64')
+        return result
+
+    def _clean_brand_column(self, col):
+        """Vectorized brand whitespace strip"""
+        is_str = self._string_mask(col)
+        if not is_str.any():
+            return col
+        return self._as_applied(col.str.strip().where(is_str, col))
+
     def _clean_price(self, price):
         """Convert price string to numeric"""
         if isinstance(price, str):
@@ -251,273 +2167,1146 @@ class DataCleaner:
                 return int(reviews)
         return 0
     
-    def save_cleaned_data(self, filename=None):
-        """Save cleaned data to CSV"""
+    def _default_cleaned_filename(self):
+        base, ext = os.path.splitext(self.filepath.rstrip(os.sep))
+        return f"{base}_cleaned{ext}"
+
+    def save_cleaned_data(self, filename=None, file_format=None):
+        """Save cleaned data to CSV or a Parquet dataset"""
+        file_format = file_format or (storage_format(self.filepath) if self.filepath else 'csv')
         if filename is None:
-            base, ext = os.path.splitext(self.filepath)
-            filename = f"{base}_cleaned{ext}"
+            filename = with_storage_suffix(self._default_cleaned_filename(), file_format)
         
-        self.df.to_csv(filename, index=False)
+        # The cleaned frame covers all raw rows, so it replaces any earlier output
+        save_products(self.df, filename, file_format, cleaned=True, append=False)
         self.cleaned_filepath = filename
         print(f"Cleaned data saved to {filename}")
         return filename
 
+# Chart renderers. Each one draws on its own Figure instead of the global pyplot
+# state, so nothing accumulates between charts. Bump CHART_STYLE_VERSION when a
+# renderer changes so cached charts are redrawn.
+CHART_STYLE_VERSION = 1
+
+def _plotting():
+    """Import the plotting stack on first use; returns (Figure, seaborn)"""
+    import matplotlib
+    matplotlib.use('Agg')  # Charts are only ever saved to files; never open a GUI window
+    from matplotlib.figure import Figure
+    import seaborn as sns
+    return Figure, sns
+
+def _rotate_xticklabels(ax):
+    ax.tick_params(axis='x', labelrotation=45)
+    for label in ax.get_xticklabels():
+        label.set_horizontalalignment('right')
+
+def render_top_brands_chart(top_brands, path):
+    Figure, _ = _plotting()
+    fig = Figure(figsize=(12, 6))
+    ax = fig.add_subplot()
+    top_brands.plot(kind='bar', color='skyblue', ax=ax)
+    ax.set_title('Top 5 Brands by Number of Products', fontsize=16)
+    ax.set_xlabel('Brand', fontsize=14)
+    ax.set_ylabel('Number of Products', fontsize=14)
+    _rotate_xticklabels(ax)
+    
+    # Add count labels on top of bars
+    for i, v in enumerate(top_brands):
+        ax.text(i, v + 0.1, str(v), ha='center', fontsize=12)
+    
+    fig.tight_layout()
+    fig.savefig(path)
+
+def render_brand_share_chart(pie_data, path):
+    Figure, _ = _plotting()
+    fig = Figure(figsize=(10, 10))
+    ax = fig.add_subplot()
+    ax.pie(pie_data, labels=pie_data.index, autopct='%1.1f%%', startangle=90,
+           shadow=True, explode=[0.05]*len(pie_data))
+    ax.set_title('Brand Market Share', fontsize=16)
+    ax.axis('equal')  # Equal aspect ratio ensures pie is circular
+    fig.tight_layout()
+    fig.savefig(path)
+
+def render_price_rating_scatter(valid_df, path):
+    Figure, _ = _plotting()
+    fig = Figure(figsize=(12, 8))
+    ax = fig.add_subplot()
+    ax.scatter(valid_df['rating'], valid_df['selling_price'], alpha=0.6)
+    ax.set_title('Price vs Rating', fontsize=16)
+    ax.set_xlabel('Rating', fontsize=14)
+    ax.set_ylabel('Price (₹)', fontsize=14)
+    ax.grid(True, linestyle='--', alpha=0.7)
+    fig.tight_layout()
+    fig.savefig(path)
+
+def render_price_by_rating_chart(price_by_rating, path):
+    Figure, sns = _plotting()
+    fig = Figure(figsize=(12, 6))
+    ax = fig.add_subplot()
+    sns.barplot(x='rating_bin', y='selling_price', data=price_by_rating, ax=ax)
+    ax.set_title('Average Price by Rating Range', fontsize=16)
+    ax.set_xlabel('Rating Range', fontsize=14)
+    ax.set_ylabel('Average Price (₹)', fontsize=14)
+    
+    # Add average price labels on top of bars
+    for i, row in enumerate(price_by_rating.itertuples()):
+        ax.text(i, row.selling_price + 10, f'₹{row.selling_price:.2f}', 
+                ha='center', fontsize=12)
+    
+    fig.tight_layout()
+    fig.savefig(path)
+
+def render_top_reviews_chart(top_reviewed, path):
+    Figure, sns = _plotting()
+    fig = Figure(figsize=(14, 6))
+    ax = fig.add_subplot()
+    sns.barplot(x='product_title', y='num_reviews', data=top_reviewed, ax=ax)
+    ax.set_title('Top 5 Products by Number of Reviews', fontsize=16)
+    ax.set_xlabel('Product', fontsize=14)
+    ax.set_ylabel('Number of Reviews', fontsize=14)
+    _rotate_xticklabels(ax)
+    
+    # Add review count labels
+    for i, v in enumerate(top_reviewed['num_reviews']):
+        ax.text(i, v + 10, str(v), ha='center', fontsize=12)
+    
+    fig.tight_layout()
+    fig.savefig(path)
+
+def render_top_rated_chart(top_rated, path, min_reviews=10):
+    Figure, sns = _plotting()
+    fig = Figure(figsize=(14, 6))
+    ax = fig.add_subplot()
+    sns.barplot(x='product_title', y='rating', data=top_rated, ax=ax)
+    ax.set_title(f'Top 5 Highest Rated Products (with at least {min_reviews} reviews)', fontsize=16)
+    ax.set_xlabel('Product', fontsize=14)
+    ax.set_ylabel('Rating', fontsize=14)
+    _rotate_xticklabels(ax)
+    ax.set_ylim(0, 5.5)  # Rating scale is 0-5
+    
+    # Add rating labels
+    for i, v in enumerate(top_rated['rating']):
+        ax.text(i, v + 0.1, f"{v:.1f}", ha='center', fontsize=12)
+    
+    fig.tight_layout()
+    fig.savefig(path)
+
+def _render_chart(render, data, path, options):
+    """Draw one chart and return its render time"""
+    started = time.perf_counter()
+    render(data, path, **options)
+    return time.perf_counter() - started
+
+class ChartRenderer:
+    """Renders charts one after another, skipping charts whose data is unchanged"""
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+        self.manifest_path = os.path.join(output_dir, 'chart_manifest.json')
+        self.pending = []
+        self.render_seconds = {}
+        self.skipped = []
+
+    @staticmethod
+    def data_hash(render, data, options):
+        """Content hash of everything that determines how a chart looks"""
+        digest = hashlib.sha256()
+        digest.update(f"{render.__name__}:{CHART_STYLE_VERSION}:{sorted(options.items())}".encode('utf-8'))
+        digest.update(repr(list(data.columns if isinstance(data, pd.DataFrame) else [data.name])).encode('utf-8'))
+        digest.update(pd.util.hash_pandas_object(data, index=True).to_numpy().tobytes())
+        return digest.hexdigest()
+
+    def submit(self, filename, render, data, **options):
+        """Queue a chart; returns its path, which is valid once render_all has run"""
+        path = f"{self.output_dir}/{filename}"
+        self.pending.append((path, render, data, options))
+        return path
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def render_all(self):
+        """Render every queued chart whose data changed since it was last drawn; returns their paths"""
+        skipped_before = len(self.skipped)
+        paths = list(self.render_stream())
+        skipped = set(self.skipped[skipped_before:])
+        return [path for path in paths if path not in skipped]
+
+    def render_stream(self):
+        """Render every queued chart in one pass, yielding each chart's path, in submission
+        order, once it is drawn (or found unchanged). Each chart is drawn when the caller
+        asks for it, so the caller can use it before the next one is drawn."""
+        manifest = self._load_manifest()
+        entries = []
+        for path, render, data, options in self.pending:
+            data_hash = self.data_hash(render, data, options)
+            if manifest.get(path) == data_hash and os.path.exists(path):
+                entries.append((path, None))
+            else:
+                entries.append((path, (path, render, data, options, data_hash)))
+        self.pending = []
+        jobs = [job for _, job in entries if job is not None]
+
+        def finish(job, seconds):
+            path, _, _, _, data_hash = job
+            self.render_seconds[path] = seconds
+            manifest[path] = data_hash
+            METRICS.observe('chart_render_seconds', seconds, chart=os.path.basename(path))
+            METRICS.inc('charts_rendered_total')
+
+        try:
+            for path, job in entries:
+                if job is None:
+                    self._skip(path)
+                else:
+                    finish(job, _render_chart(job[1], job[2], job[0], job[3]))
+                yield path
+        finally:
+            if jobs:
+                with open(self.manifest_path, 'w', encoding='utf-8') as f:
+                    json.dump(manifest, f, indent=2)
+
+    def _skip(self, path):
+        self.skipped.append(path)
+        METRICS.inc('charts_skipped_total')
+
+class ReportStats:
+    """Every statistic the report needs, computed once from shared groupings"""
+    RATING_BINS = [0, 3.0, 3.5, 4.0, 4.5, 5.0]
+    RATING_LABELS = ['0-3.0', '3.0-3.5', '3.5-4.0', '4.0-4.5', '4.5-5.0']
+    PRODUCT_FIELDS = ['product_title', 'brand', 'rating', 'selling_price', 'num_reviews']
+
+    def __init__(self, df, top_n=5, top_brand_ratings=10, top_value=10, min_reviews=10):
+        self.min_reviews = min_reviews
+        self.total_products = len(df)
+        # Every number below is exact; sketch-built stats carry their error bounds here
+        self.error_bounds = None
+        # All-missing ratings come out of cleaning as object None; make them float NaN
+        rating = pd.to_numeric(df['rating'])
+        price = df['selling_price']
+
+        # One groupby over brand gives both product counts and average ratings
+        by_brand = rating.groupby(df['brand'], sort=False, observed=True)
+        self.brand_counts = by_brand.size().sort_values(ascending=False, kind='stable')
+        self.brand_counts.index.name = 'brand'
+        self.brand_counts.name = 'count'
+        self.brand_ratings = by_brand.mean().sort_values(ascending=False, kind='stable')
+        self.brand_ratings.name = 'rating'
+        self._summarize_brands(top_n, top_brand_ratings)
+
+        # Rows with both a rating and a price, selected by mask instead of a mutated copy
+        valid = rating.notna() & price.notna()
+        self.price_rating = pd.DataFrame({'rating': rating[valid], 'selling_price': price[valid]})
+        rating_bin = pd.cut(self.price_rating['rating'], bins=self.RATING_BINS,
+                            labels=self.RATING_LABELS).rename('rating_bin')
+        self.price_by_rating = (self.price_rating['selling_price']
+                                .groupby(rating_bin, observed=True).mean().reset_index())
+        self.median_price = self.price_rating['selling_price'].median()
+
+        # Top-k selection instead of sorting whole frames
+        products = df[self.PRODUCT_FIELDS].assign(rating=rating)
+        value = products[valid & (rating >= 4.0) & (price < self.median_price)]
+        self.value_products = value.nlargest(top_value, 'rating')
+        self.top_reviewed = products.nlargest(top_n, 'num_reviews')
+        self.top_rated = products[(products['num_reviews'] >= min_reviews) & rating.notna()].nlargest(top_n, 'rating')
+
+    @classmethod
+    def from_sketch(cls, sketch, top_brand_ratings=10):
+        """Report statistics from an AnalyticsSketch, without the rows it summarizes"""
+        stats = cls.__new__(cls)
+        stats.min_reviews = sketch.min_reviews
+        stats.total_products = sketch.total_products
+        stats.error_bounds = sketch.error_bounds()
+
+        brands = pd.DataFrame.from_dict(sketch.brands, orient='index',
+                                        columns=['count', 'rating_sum', 'rating_count'])
+        brands.index.name = 'brand'
+        stats.brand_counts = brands['count'].sort_values(ascending=False, kind='stable')
+        stats.brand_ratings = (brands['rating_sum'] / brands['rating_count'].where(brands['rating_count'] > 0))
+        stats.brand_ratings = stats.brand_ratings.sort_values(ascending=False, kind='stable').rename('rating')
+        stats._summarize_brands(sketch.top_n, top_brand_ratings)
+
+        stats.price_rating = pd.DataFrame([row[1:] for row in sketch.sample],
+                                          columns=['rating', 'selling_price'], dtype=float)
+        stats.price_by_rating = pd.DataFrame(
+            [(label, total / count) for label, (total, count) in sketch.bins.items() if count],
+            columns=['rating_bin', 'selling_price'])
+        stats.median_price = sketch.price_quantile(0.5)
+
+        stats.value_products = sketch.value_products(stats.median_price)
+        stats.top_reviewed = sketch.top_frame('num_reviews')
+        stats.top_rated = sketch.top_frame('rating')
+        return stats
+
+    def _summarize_brands(self, top_n, top_brand_ratings):
+        self.top_brand_ratings = self.brand_ratings.dropna().head(top_brand_ratings)
+        self.top_brands = self.brand_counts.head(top_n)
+        self.top_brand = self.brand_counts.index[0] if len(self.brand_counts) else None
+        total = self.brand_counts.sum()
+        self.top_brands_share = 100 * self.top_brands.sum() / total if total else 0.0
+        self.brand_share = pd.concat([self.top_brands,
+                                      pd.Series({'Others': self.brand_counts.iloc[top_n:].sum()})])
+
+    @staticmethod
+    def _records(df):
+        return json.loads(df.to_json(orient='records', force_ascii=False))
+
+    @staticmethod
+    def _mapping(series):
+        return {str(key): (None if pd.isna(value) else value.item() if hasattr(value, 'item') else value)
+                for key, value in series.items()}
+
+    def to_dict(self):
+        """The statistics as plain JSON-serializable data"""
+        return {
+            'total_products': self.total_products,
+            'top_brand': self.top_brand,
+            'top_brands_share': round(float(self.top_brands_share), 2),
+            'brand_counts': self._mapping(self.brand_counts),
+            'brand_ratings': self._mapping(self.top_brand_ratings),
+            'brand_share': self._mapping(self.brand_share),
+            'price_by_rating': self._mapping(self.price_by_rating.set_index('rating_bin')['selling_price']),
+            'median_price': None if pd.isna(self.median_price) else float(self.median_price),
+            'value_products': self._records(self.value_products),
+            'top_reviewed': self._records(self.top_reviewed),
+            'top_rated': self._records(self.top_rated),
+            'min_reviews': self.min_reviews,
+            'error_bounds': self.error_bounds,
+        }
+
+    def to_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2, ensure_ascii=False)
+        return path
+
+class AnalyticsSketch:
+    """Mergeable summary of cleaned crawls: exact per-brand and per-rating-bin totals,
+    a log-bucket price quantile sketch, top-k product lists and a bottom-k scatter sample"""
+    def __init__(self, top_n=5, top_value=10, min_reviews=10, relative_accuracy=0.01, sample_size=2000):
+        self.top_n = top_n
+        self.top_value = top_value
+        self.min_reviews = min_reviews
+        self.relative_accuracy = relative_accuracy
+        self.sample_size = sample_size
+        self._log_gamma = np.log((1 + relative_accuracy) / (1 - relative_accuracy))
+
+        self.total_products = 0
+        self.crawls = 0
+        self.brands = {}        # brand -> [products, rating sum, rated products]
+        self.bins = {label: [0.0, 0] for label in ReportStats.RATING_LABELS}  # bin -> [price sum, count]
+        self.price_buckets = {}  # log bucket index -> count
+        self.price_zero = 0      # prices too small to bucket
+        self.sample = []         # [priority, rating, price], the sample_size lowest priorities
+        self.top = {'num_reviews': {}, 'rating': {}}  # product key -> highest value seen, with its record
+        self.value_candidates = {}  # rating -> the top_value cheapest products at that rating
+
+    def _settings(self):
+        return (self.top_n, self.top_value, self.min_reviews, self.relative_accuracy, self.sample_size)
+
+    @staticmethod
+    def _key(record):
+        return f"{record['product_title']}\x1f{record['brand']}"
+
+    def update(self, df):
+        """Fold one cleaned crawl into the summary, in time proportional to its size"""
+        if df.empty:
+            return self
+        self.crawls += 1
+        self.total_products += len(df)
+        rating = pd.to_numeric(df['rating'])
+        price = pd.to_numeric(df['selling_price'])
+        reviews = pd.to_numeric(df['num_reviews'])
+
+        by_brand = rating.groupby(df['brand'], sort=False, observed=True).agg(['size', 'sum', 'count'])
+        for brand, (size, total, rated) in zip(by_brand.index, by_brand.itertuples(index=False)):
+            totals = self.brands.setdefault(str(brand), [0, 0.0, 0])
+            totals[0] += int(size)
+            totals[1] += float(total)
+            totals[2] += int(rated)
+
+        valid = rating.notna() & price.notna()
+        rating_bin = pd.cut(rating[valid], bins=ReportStats.RATING_BINS, labels=ReportStats.RATING_LABELS)
+        by_bin = price[valid].groupby(rating_bin, observed=True).agg(['sum', 'count'])
+        for label, (total, count) in zip(by_bin.index, by_bin.itertuples(index=False)):
+            self.bins[label][0] += float(total)
+            self.bins[label][1] += int(count)
+
+        self._add_prices(price[valid].to_numpy(dtype=float))
+
+        # Bottom-k sampling on random priorities stays a uniform sample under merge
+        priorities = np.random.default_rng().random(int(valid.sum()))
+        keep = np.argsort(priorities)[:self.sample_size]
+        self._merge_sample(zip(priorities[keep].tolist(), rating[valid].to_numpy()[keep].tolist(),
+                               price[valid].to_numpy()[keep].tolist()))
+
+        products = df[ReportStats.PRODUCT_FIELDS].assign(rating=rating, selling_price=price,
+                                                         num_reviews=reviews)
+        self._merge_top('num_reviews', products.nlargest(self.top_n, 'num_reviews'))
+        rated = products[(reviews >= self.min_reviews) & rating.notna()]
+        self._merge_top('rating', rated.nlargest(self.top_n, 'rating'))
+
+        # Value products need the final median, so keep the cheapest few at each high rating
+        value = products[valid & (rating >= 4.0)].sort_values('selling_price', kind='stable')
+        for product_rating, group in value.groupby('rating', sort=False):
+            self._merge_value(float(product_rating), self._records(group.head(self.top_value)))
+        return self
+
+    def merge(self, other):
+        """Fold another sketch into this one; the result is the sketch of both inputs"""
+        if other._settings() != self._settings():
+            raise ValueError("Cannot merge sketches built with different settings")
+        self.crawls += other.crawls
+        self.total_products += other.total_products
+        for brand, (size, total, rated) in other.brands.items():
+            totals = self.brands.setdefault(brand, [0, 0.0, 0])
+            totals[0] += size
+            totals[1] += total
+            totals[2] += rated
+        for label, (total, count) in other.bins.items():
+            self.bins[label][0] += total
+            self.bins[label][1] += count
+        for index, count in other.price_buckets.items():
+            self.price_buckets[index] = self.price_buckets.get(index, 0) + count
+        self.price_zero += other.price_zero
+        self._merge_sample(other.sample)
+        for field, products in other.top.items():
+            self._merge_top(field, list(products.values()))
+        for product_rating, products in other.value_candidates.items():
+            self._merge_value(product_rating, products)
+        return self
+
+    def _add_prices(self, prices):
+        positive = prices[prices > 1e-9]
+        self.price_zero += len(prices) - len(positive)
+        if not len(positive):
+            return
+        indexes, counts = np.unique(np.ceil(np.log(positive) / self._log_gamma).astype(np.int64),
+                                    return_counts=True)
+        for index, count in zip(indexes.tolist(), counts.tolist()):
+            self.price_buckets[index] = self.price_buckets.get(index, 0) + count
+
+    def _merge_sample(self, rows):
+        self.sample = sorted([*self.sample, *map(list, rows)])[:self.sample_size]
+
+    @staticmethod
+    def _records(df):
+        return ReportStats._records(df)
+
+    def _merge_top(self, field, records):
+        if isinstance(records, pd.DataFrame):
+            records = self._records(records)
+        top = self.top[field]
+        for record in records:
+            key = self._key(record)
+            if key not in top or record[field] > top[key][field]:
+                top[key] = record
+        ranked = sorted(top.items(), key=lambda item: (-item[1][field], item[0]))
+        self.top[field] = dict(ranked[:self.top_n])
+
+    def _merge_value(self, product_rating, records):
+        cheapest = {}
+        for record in [*self.value_candidates.get(product_rating, []), *records]:
+            key = self._key(record)
+            if key not in cheapest or record['selling_price'] < cheapest[key]['selling_price']:
+                cheapest[key] = record
+        ranked = sorted(cheapest.values(), key=lambda record: (record['selling_price'], self._key(record)))
+        self.value_candidates[product_rating] = ranked[:self.top_value]
+
+    def price_quantile(self, q):
+        """Price at quantile q, within relative_accuracy of the true value.
+
+        Interpolates linearly between the two nearest ranks like Series.quantile and
+        median do, so an even count's median sits between its two middle prices. Each
+        rank's value is within relative_accuracy, and so is their weighted mean.
+        """
+        total = self.price_zero + sum(self.price_buckets.values())
+        if not total:
+            return float('nan')
+        rank = q * (total - 1)
+        lower = int(np.floor(rank))
+        fraction = rank - lower
+        low_value = self._price_at_rank(lower)
+        if not fraction:
+            return low_value
+        return low_value + fraction * (self._price_at_rank(lower + 1) - low_value)
+
+    def _price_at_rank(self, rank):
+        """Estimated price of the rank-th cheapest product, counting from 0"""
+        seen = self.price_zero
+        if rank < seen:
+            return 0.0
+        gamma = np.exp(self._log_gamma)
+        for index in sorted(self.price_buckets):
+            seen += self.price_buckets[index]
+            if rank < seen:
+                return float(2 * gamma ** index / (gamma + 1))
+        return float(2 * gamma ** max(self.price_buckets) / (gamma + 1))
+
+    def value_products(self, median_price):
+        """Highest-rated products priced under median_price, cheapest first within a rating"""
+        chosen = []
+        for product_rating in sorted(self.value_candidates, reverse=True):
+            chosen.extend(record for record in self.value_candidates[product_rating]
+                          if record['selling_price'] < median_price)
+            if len(chosen) >= self.top_value:
+                break
+        return pd.DataFrame(chosen[:self.top_value], columns=ReportStats.PRODUCT_FIELDS)
+
+    def top_frame(self, field):
+        return pd.DataFrame(list(self.top[field].values()), columns=ReportStats.PRODUCT_FIELDS)
+
+    def error_bounds(self):
+        """How far each sketch-derived statistic can be from a full rescan"""
+        return {
+            'brand_counts': 'exact',
+            'brand_ratings': 'exact',
+            'price_by_rating': 'exact',
+            'median_price': f"within {self.relative_accuracy:.1%} of the true median",
+            'value_products': (f"exact against the estimated median; products priced within "
+                               f"{self.relative_accuracy:.1%} of the median may be included or left out"),
+            'top_reviewed': 'exact; each product appears once, at its highest review count',
+            'top_rated': 'exact; each product appears once, at its highest rating',
+            'price_rating': f"uniform sample of up to {self.sample_size} products",
+        }
+
+    def to_dict(self):
+        return {
+            'settings': list(self._settings()),
+            'total_products': self.total_products,
+            'crawls': self.crawls,
+            'brands': self.brands,
+            'bins': self.bins,
+            'price_buckets': {str(index): count for index, count in self.price_buckets.items()},
+            'price_zero': self.price_zero,
+            'sample': self.sample,
+            'top': {field: list(products.values()) for field, products in self.top.items()},
+            'value_candidates': [[product_rating, products]
+                                 for product_rating, products in self.value_candidates.items()],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(*data['settings'])
+        sketch.total_products = data['total_products']
+        sketch.crawls = data['crawls']
+        sketch.brands = data['brands']
+        sketch.bins = data['bins']
+        sketch.price_buckets = {int(index): count for index, count in data['price_buckets'].items()}
+        sketch.price_zero = data['price_zero']
+        sketch.sample = data['sample']
+        sketch.top = {field: {cls._key(record): record for record in records}
+                      for field, records in data['top'].items()}
+        sketch.value_candidates = {product_rating: products
+                                   for product_rating, products in data['value_candidates']}
+        return sketch
+
+    def save(self, path):
+        # Write then rename so an interrupted save never leaves a truncated sketch
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        return path
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        """Load a saved sketch, or start an empty one if the file does not exist yet"""
+        if not os.path.exists(path):
+            return cls(**kwargs)
+        with open(path, encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+def report_table(data, columns):
+    """A report table. columns maps each header to (source column, format template). Cells are
+    formatted from plain column lists, which measured faster than iterrows() or pandas string
+    operations at every table size"""
+    templates = [template for _, template in columns.values()]
+    values = [data[column].tolist() for column, _ in columns.values()]
+    rows = [[template.format(value) for template, value in zip(templates, row)] for row in zip(*values)]
+    return {'type': 'table', 'columns': list(columns), 'rows': rows, 'data': data}
+
+REPORT_FOOTER = "This report was auto-generated based on scraped Amazon.in data"
+
+class ReportWriter:
+    """Writes a report one section at a time and flushes after each,
+    so a partially generated report can already be read"""
+    extension = None
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def begin(self, header):
+        self._file = open(self.path, 'w', encoding='utf-8')
+
+    def write_section(self, section):
+        raise NotImplementedError
+
+    def end(self, footer):
+        pass
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _write(self, text):
+        self._file.write(text)
+        self._file.flush()
+
+class MarkdownReportWriter(ReportWriter):
+    extension = 'md'
+
+    def begin(self, header):
+        super().begin(header)
+        parts = [f"# {header['title']}\n\n",
+                 f"*Generated on: {header['generated_on']}*\n\n",
+                 f"*Total Products Analyzed: {header['total_products']}*\n\n"]
+        if header['error_bounds']:
+            parts.append("*Computed from summary sketches. Approximation bounds:*\n\n")
+            parts.extend(f"- `{statistic}`: {bound}\n" for statistic, bound in header['error_bounds'].items())
+            parts.append("\n")
+        self._write(''.join(parts))
+
+    def write_section(self, section):
+        parts = [f"## {section['title']}\n\n"]
+        for block in section['blocks']:
+            if block['type'] == 'heading':
+                parts.append(f"### {block['text']}\n\n")
+            elif block['type'] == 'image':
+                parts.append(f"![{block['alt']}](./{os.path.basename(block['path'])})\n\n")
+            elif block['type'] == 'bullets':
+                parts.append(f"**{block['title']}:**\n")
+                parts.extend(f"- {item}\n" for item in block['items'])
+                parts.append("\n")
+            elif block['type'] == 'table':
+                columns = block['columns']
+                parts.append("| " + " | ".join(columns) + " |\n")
+                parts.append("|" + "|".join("-" * (len(column) + 2) for column in columns) + "|\n")
+                parts.extend("| " + " | ".join(row) + " |\n" for row in block['rows'])
+                parts.append("\n")
+        self._write(''.join(parts))
+
+    def end(self, footer):
+        self._write(f"---\n*{footer}*\n")
+
+class HtmlReportWriter(ReportWriter):
+    extension = 'html'
+
+    @staticmethod
+    def _inline(text):
+        # Escape, then keep the `code` spans of the markdown text
+        return re.sub(r'`([^`]+)`', r'<code>\1</code>', html.escape(text))
+
+    def begin(self, header):
+        super().begin(header)
+        title = html.escape(header['title'])
+        parts = ['<!DOCTYPE html>\n<html>\n<head>\n<meta charset="utf-8">\n',
+                 f"<title>{title}</title>\n</head>\n<body>\n<h1>{title}</h1>\n",
+                 f"<p><em>Generated on: {html.escape(header['generated_on'])}</em></p>\n",
+                 f"<p><em>Total Products Analyzed: {header['total_products']}</em></p>\n"]
+        if header['error_bounds']:
+            parts.append("<p><em>Computed from summary sketches. Approximation bounds:</em></p>\n<ul>\n")
+            parts.extend(f"<li><code>{html.escape(statistic)}</code>: {html.escape(bound)}</li>\n"
+                         for statistic, bound in header['error_bounds'].items())
+            parts.append("</ul>\n")
+        self._write(''.join(parts))
+
+    def write_section(self, section):
+        parts = [f'<section id="{section["id"]}">\n<h2>{html.escape(section["title"])}</h2>\n']
+        for block in section['blocks']:
+            if block['type'] == 'heading':
+                parts.append(f"<h3>{html.escape(block['text'])}</h3>\n")
+            elif block['type'] == 'image':
+                parts.append(f'<img src="{html.escape(os.path.basename(block["path"]))}" '
+                             f'alt="{html.escape(block["alt"])}">\n')
+            elif block['type'] == 'bullets':
+                parts.append(f"<p><strong>{html.escape(block['title'])}:</strong></p>\n<ul>\n")
+                parts.extend(f"<li>{self._inline(item)}</li>\n" for item in block['items'])
+                parts.append("</ul>\n")
+            elif block['type'] == 'table':
+                parts.append("<table>\n<tr>" + "".join(f"<th>{html.escape(column)}</th>"
+                                                        for column in block['columns']) + "</tr>\n")
+                parts.extend("<tr>" + "".join(f"<td>{html.escape(cell)}</td>" for cell in row) + "</tr>\n"
+                             for row in block['rows'])
+                parts.append("</table>\n")
+        parts.append("</section>\n")
+        self._write(''.join(parts))
+
+    def end(self, footer):
+        self._write(f"<hr>\n<p><em>{html.escape(footer)}</em></p>\n</body>\n</html>\n")
+
+class JsonReportWriter(ReportWriter):
+    """Rewrites the whole document after every section, so readers always get valid JSON;
+    'complete' turns true once the last section is in"""
+    extension = 'json'
+
+    def begin(self, header):
+        self.document = {**header, 'complete': False, 'sections': []}
+        self._dump()
+
+    def write_section(self, section):
+        blocks = []
+        for block in section['blocks']:
+            if block['type'] == 'table':
+                blocks.append({'type': 'table', 'columns': block['columns'],
+                               'rows': block['rows'],
+                               'records': ReportStats._records(block['data'])})
+            elif block['type'] == 'image':
+                blocks.append({**block, 'path': os.path.basename(block['path'])})
+            else:
+                blocks.append(block)
+        self.document['sections'].append({'id': section['id'], 'title': section['title'], 'blocks': blocks})
+        self._dump()
+
+    def end(self, footer):
+        self.document['footer'] = footer
+        self.document['complete'] = True
+        self._dump()
+
+    def _dump(self):
+        # Write then rename so a reader polling the file never sees it half written
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.document, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+REPORT_WRITERS = {writer.extension: writer
+                  for writer in (MarkdownReportWriter, HtmlReportWriter, JsonReportWriter)}
+
 class DataAnalyzer:
-    def __init__(self, df):
+    # The only columns the analyses read; columnar formats load just these
+    ANALYSIS_COLUMNS = ['product_title', 'brand', 'rating', 'num_reviews', 'selling_price']
+
+    @classmethod
+    def from_file(cls, path):
+        """Load cleaned data for analysis, reading only the columns the analyses use"""
+        return cls(load_products(path, columns=cls.ANALYSIS_COLUMNS))
+
+    def __init__(self, df=None, sketch=None):
         self.df = df
+        self.sketch = sketch
         self.output_dir = 'amazon_analysis_output'
         
         # Create output directory if it doesn't exist
         if not os.path.exists(self.output_dir):
             os.makedirs(self.output_dir)
+
+        self.renderer = ChartRenderer(self.output_dir)
+        self._defer_rendering = False
+        self._stats = None
+
+    @property
+    def stats(self):
+        """Report statistics, computed on first use and shared by every analysis"""
+        if self._stats is None:
+            if self.sketch is not None:
+                self._stats = ReportStats.from_sketch(self.sketch)
+            else:
+                self._stats = ReportStats(self.df)
+        return self._stats
+
+    def add_crawl(self, df):
+        """Fold a new cleaned crawl into the summary sketch the report is built from"""
+        if self.sketch is None:
+            self.sketch = AnalyticsSketch()
+            if self.df is not None:
+                self.sketch.update(self.df)
+        self.sketch.update(df)
+        self._stats = None
+        return self.sketch
     
     def brand_performance(self):
         """Analyze brand performance"""
-        # Count products per brand
-        brand_counts = self.df['brand'].value_counts()
-        
-        # Average rating by brand
-        brand_ratings = self.df.groupby('brand')['rating'].mean().sort_values(ascending=False)
-        
-        # Create bar chart for top 5 brands by frequency
-        plt.figure(figsize=(12, 6))
-        ax = brand_counts.head(5).plot(kind='bar', color='skyblue')
-        plt.title('Top 5 Brands by Number of Products', fontsize=16)
-        plt.xlabel('Brand', fontsize=14)
-        plt.ylabel('Number of Products', fontsize=14)
-        plt.xticks(rotation=45, ha='right')
-        
-        # Add count labels on top of bars
-        for i, v in enumerate(brand_counts.head(5)):
-            ax.text(i, v + 0.1, str(v), ha='center', fontsize=12)
-            
-        plt.tight_layout()
-        top_brands_chart = f"{self.output_dir}/top_brands_chart.png"
-        plt.savefig(top_brands_chart)
-        
-        # Create pie chart for brand share
-        plt.figure(figsize=(10, 10))
-        # Combine smaller brands into "Others"
-        top_n = 5
-        other_count = brand_counts.iloc[top_n:].sum()
-        pie_data = pd.concat([brand_counts.head(top_n), pd.Series({'Others': other_count})])
-        
-        plt.pie(pie_data, labels=pie_data.index, autopct='%1.1f%%', startangle=90, 
-                shadow=True, explode=[0.05]*len(pie_data))
-        plt.title('Brand Market Share', fontsize=16)
-        plt.axis('equal')  # Equal aspect ratio ensures pie is circular
-        plt.tight_layout()
-        brand_share_chart = f"{self.output_dir}/brand_share_chart.png"
-        plt.savefig(brand_share_chart)
-        
+        stats = self.stats
+
+        # Bar chart for top 5 brands by frequency
+        top_brands_chart = self.renderer.submit(
+            'top_brands_chart.png', render_top_brands_chart, stats.top_brands)
+
+        # Pie chart for brand share, smaller brands combined into "Others"
+        brand_share_chart = self.renderer.submit(
+            'brand_share_chart.png', render_brand_share_chart, stats.brand_share)
+        self._render_now()
+
         return {
-            'brand_counts': brand_counts,
-            'brand_ratings': brand_ratings,
+            'brand_counts': stats.brand_counts,
+            'brand_ratings': stats.brand_ratings,
             'top_brands_chart': top_brands_chart,
             'brand_share_chart': brand_share_chart
         }
-    
+
     def price_vs_rating(self):
         """Analyze relationship between price and rating"""
-        # Filter out products with missing ratings or prices
-        valid_df = self.df.dropna(subset=['rating', 'selling_price'])
-        
-        # Create scatter plot
-        plt.figure(figsize=(12, 8))
-        plt.scatter(valid_df['rating'], valid_df['selling_price'], alpha=0.6)
-        plt.title('Price vs Rating', fontsize=16)
-        plt.xlabel('Rating', fontsize=14)
-        plt.ylabel('Price (₹)', fontsize=14)
-        plt.grid(True, linestyle='--', alpha=0.7)
-        plt.tight_layout()
-        price_rating_scatter = f"{self.output_dir}/price_rating_scatter.png"
-        plt.savefig(price_rating_scatter)
-        
-        # Create rating bins
-        valid_df['rating_bin'] = pd.cut(valid_df['rating'], 
-                                       bins=[0, 3.0, 3.5, 4.0, 4.5, 5.0],
-                                       labels=['0-3.0', '3.0-3.5', '3.5-4.0', '4.0-4.5', '4.5-5.0'])
-        
+        stats = self.stats
+
+        price_rating_scatter = self.renderer.submit(
+            'price_rating_scatter.png', render_price_rating_scatter, stats.price_rating)
+
         # Average price by rating range
-        price_by_rating = valid_df.groupby('rating_bin')['selling_price'].mean().reset_index()
-        
-        plt.figure(figsize=(12, 6))
-        ax = sns.barplot(x='rating_bin', y='selling_price', data=price_by_rating)
-        plt.title('Average Price by Rating Range', fontsize=16)
-        plt.xlabel('Rating Range', fontsize=14)
-        plt.ylabel('Average Price (₹)', fontsize=14)
-        
-        # Add average price labels on top of bars
-        for i, row in enumerate(price_by_rating.itertuples()):
-            ax.text(i, row.selling_price + 10, f'₹{row.selling_price:.2f}', 
-                    ha='center', fontsize=12)
-        
-        plt.tight_layout()
-        price_by_rating_chart = f"{self.output_dir}/price_by_rating_chart.png"
-        plt.savefig(price_by_rating_chart)
-        
-        # Identify high-rated + low-price products (value for money)
-        # High rating: >= 4.0, Low price: below median price
-        median_price = valid_df['selling_price'].median()
-        value_products = valid_df[(valid_df['rating'] >= 4.0) & 
-                                 (valid_df['selling_price'] < median_price)]
-        value_products = value_products.sort_values('rating', ascending=False)
-        
+        price_by_rating_chart = self.renderer.submit(
+            'price_by_rating_chart.png', render_price_by_rating_chart, stats.price_by_rating)
+        self._render_now()
+
         return {
             'price_rating_scatter': price_rating_scatter,
             'price_by_rating_chart': price_by_rating_chart,
-            'value_products': value_products.head(10)  # Top 10 value products
+            # Top 10 value products: rating >= 4.0 and price below the median
+            'value_products': stats.value_products
         }
-    
+
     def review_rating_distribution(self):
         """Analyze review count and rating distribution"""
-        # Top products by number of reviews
-        top_reviewed = self.df.sort_values('num_reviews', ascending=False).head(5)
-        
-        plt.figure(figsize=(14, 6))
-        ax = sns.barplot(x='product_title', y='num_reviews', data=top_reviewed)
-        plt.title('Top 5 Products by Number of Reviews', fontsize=16)
-        plt.xlabel('Product', fontsize=14)
-        plt.ylabel('Number of Reviews', fontsize=14)
-        plt.xticks(rotation=45, ha='right')
-        
-        # Add review count labels
-        for i, v in enumerate(top_reviewed['num_reviews']):
-            ax.text(i, v + 10, str(v), ha='center', fontsize=12)
-            
-        plt.tight_layout()
-        top_reviews_chart = f"{self.output_dir}/top_reviews_chart.png"
-        plt.savefig(top_reviews_chart)
-        
-        # Top products by rating (with at least 10 reviews)
-        min_reviews = 10
-        #top_rated = self.df[self.df['num_reviews'] >= min_reviews].sort_values('rating', ascending=False).head(5)
-        top_rated = self.df[(self.df['num_reviews'] >= min_reviews) & (self.df['rating'].notnull())].sort_values('rating', ascending=False).head(5)
-
-        plt.figure(figsize=(14, 6))
-        ax = sns.barplot(x='product_title', y='rating', data=top_rated)
-        plt.title(f'Top 5 Highest Rated Products (with at least {min_reviews} reviews)', fontsize=16)
-        plt.xlabel('Product', fontsize=14)
-        plt.ylabel('Rating', fontsize=14)
-        plt.xticks(rotation=45, ha='right')
-        plt.ylim(0, 5.5)  # Rating scale is 0-5
-        
-        # Add rating labels
-        for i, v in enumerate(top_rated['rating']):
-            ax.text(i, v + 0.1, f"{v:.1f}", ha='center', fontsize=12)
-            
-        plt.tight_layout()
-        top_rated_chart = f"{self.output_dir}/top_rated_chart.png"
-        plt.savefig(top_rated_chart)
-        
+        stats = self.stats
+
+        top_reviews_chart = self.renderer.submit(
+            'top_reviews_chart.png', render_top_reviews_chart,
+            stats.top_reviewed[['product_title', 'num_reviews']])
+        top_rated_chart = self.renderer.submit(
+            'top_rated_chart.png', render_top_rated_chart,
+            stats.top_rated[['product_title', 'rating']], min_reviews=stats.min_reviews)
+        self._render_now()
+
         return {
             'top_reviews_chart': top_reviews_chart,
             'top_rated_chart': top_rated_chart,
-            'top_reviewed': top_reviewed,
-            'top_rated': top_rated
+            'top_reviewed': stats.top_reviewed,
+            'top_rated': stats.top_rated
         }
+
+    def _render_now(self):
+        """Render submitted charts unless generate_report is batching them"""
+        if not self._defer_rendering:
+            self.renderer.render_all()
     
-    def generate_report(self, title="Amazon Sponsored Products Analysis"):
-        """Generate a report with all analyses"""
+    def generate_report(self, title="Amazon Sponsored Products Analysis", formats=('md',)):
+        """Generate a report with all analyses, writing each section to every output
+        format as soon as its analysis and charts are done; returns the first report's path"""
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        report_file = f"{self.output_dir}/amazon_analysis_report.md"
-        
-        with open(report_file, 'w',encoding="utf-8") as f:
-            # Header
-            f.write(f"# {title}\n\n")
-            f.write(f"*Generated on: {timestamp}*\n\n")
-            f.write(f"*Total Products Analyzed: {len(self.df)}*\n\n")
-            
-            # Brand Performance
-            f.write("## 1. Brand Performance Analysis\n\n")
-            brand_results = self.brand_performance()
-            
-            f.write("### Top Brands by Number of Products\n\n")
-            f.write("![Top Brands](./top_brands_chart.png)\n\n")
-            f.write("**Key Insights:**\n")
-            f.write("- The market is dominated by " + brand_results['brand_counts'].index[0] + "\n")
-            f.write("- Top 5 brands account for " + 
-                   f"{100 * brand_results['brand_counts'].head(5).sum() / brand_results['brand_counts'].sum():.1f}% " + 
-                   "of the sponsored products\n\n")
-            
-            f.write("### Brand Market Share\n\n")
-            f.write("![Brand Share](./brand_share_chart.png)\n\n")
-            
-            f.write("### Average Rating by Brand (Top 10)\n\n")
-            f.write("| Brand | Average Rating |\n")
-            f.write("|-------|---------------|\n")
-            for brand, rating in brand_results['brand_ratings'].head(10).items():
-                f.write(f"| {brand} | {rating:.2f} |\n")
-            f.write("\n")
-            
-            # Price vs Rating
-            f.write("## 2. Price vs Rating Analysis\n\n")
-            price_rating_results = self.price_vs_rating()
-            
-            f.write("### Price vs Rating Scatter Plot\n\n")
-            f.write("![Price vs Rating](./price_rating_scatter.png)\n\n")
-            f.write("**Key Insights:**\n")
-            f.write("- There's a wide range of prices across different rating levels\n")
-            f.write("- Most highly-rated products (4.5+) are distributed across various price points\n\n")
-            
-            f.write("### Average Price by Rating Range\n\n")
-            f.write("![Price by Rating](./price_by_rating_chart.png)\n\n")
-            
-            f.write("### Value for Money Products (High Rating, Low Price)\n\n")
-            f.write("| Product | Brand | Rating | Price (₹) | Reviews |\n")
-            f.write("|---------|-------|--------|-----------|--------|\n")
-            for _, product in price_rating_results['value_products'].iterrows():
-                f.write(f"| {product['product_title'][:50]}... | {product['brand']} | {product['rating']:.1f} | {product['selling_price']:.2f} | {product['num_reviews']} |\n")
-            f.write("\n")
-            
-            # Review & Rating Distribution
-            f.write("## 3. Reviews and Ratings Analysis\n\n")
-            review_results = self.review_rating_distribution()
-            
-            f.write("### Top Products by Number of Reviews\n\n")
-            f.write("![Top Reviewed](./top_reviews_chart.png)\n\n")
-            f.write("**Key Insights:**\n")
-            f.write("- The most reviewed product has significantly more reviews than others\n")
-            f.write("- Products with high review counts indicate popular items with established market presence\n\n")
-            
-            f.write("### Top Rated Products\n\n")
-            f.write("![Top Rated](./top_rated_chart.png)\n\n")
-            f.write("**Key Insights:**\n")
-            f.write("- Top rated products maintain exceptional customer satisfaction\n")
-            f.write("- Several products achieve near-perfect ratings despite having multiple reviews\n\n")
-            
-            # Summary
-            f.write("## 4. Summary and Recommendations\n\n")
-            f.write("**Market Insights:**\n")
-            f.write("- The sponsored soft toys market appears to be dominated by a few key brands\n")
-            f.write("- There are several high-quality options (high ratings) available at various price points\n")
-            f.write("- Products with high review counts and high ratings represent established market leaders\n\n")
-            
-            f.write("**Recommendations:**\n")
-            f.write("- For value-conscious consumers, focus on the 'Value for Money' products section\n")
-            f.write("- For gift-giving, consider the top-rated products with substantial review counts\n")
-            f.write("- For brand loyalty and consistency, " + brand_results['brand_counts'].index[0] + 
-                   " offers the widest selection of sponsored products\n\n")
-            
-            f.write("---\n")
-            f.write("*This report was auto-generated based on scraped Amazon.in data*\n")
-        
-        return report_file
 
-def main():
+        # The same numbers, machine-readable, for dashboards and other consumers
+        self.stats.to_json(f"{self.output_dir}/report_stats.json")
+
+        writers = [REPORT_WRITERS[fmt](f"{self.output_dir}/amazon_analysis_report.{fmt}") for fmt in formats]
+        header = {
+            'title': title,
+            'generated_on': timestamp,
+            'total_products': self.stats.total_products,
+            'error_bounds': self.stats.error_bounds,
+        }
+        # Every section's charts are queued first and drawn in one pass
+        self._defer_rendering = True
+        try:
+            sections = list(self._report_sections())
+        finally:
+            self._defer_rendering = False
+
+        charts = self.renderer.render_stream()
+        drawn = set()
+        try:
+            for writer in writers:
+                writer.begin(header)
+            started = time.perf_counter()
+            for section in sections:
+                # Write a section as soon as its charts exist, so no output links to a missing image
+                needed = {block['path'] for block in section['blocks'] if block['type'] == 'image'}
+                while not needed <= drawn:
+                    drawn.add(next(charts))
+                for writer in writers:
+                    writer.write_section(section)
+                METRICS.observe('report_section_seconds', time.perf_counter() - started, section=section['id'])
+                started = time.perf_counter()
+            for writer in writers:
+                writer.end(REPORT_FOOTER)
+            # Charts no section links to are still drawn
+            for _ in charts:
+                pass
+        finally:
+            charts.close()
+            for writer in writers:
+                writer.close()
+
+        self.report_files = {fmt: writer.path for fmt, writer in zip(formats, writers)}
+        return writers[0].path
+
+    def _report_sections(self):
+        """The report's sections in order, queuing each section's charts as it is built"""
+        stats = self.stats
+
+        # Brand Performance
+        brand_results = self.brand_performance()
+        ratings = stats.top_brand_ratings
+        brand_ratings = pd.DataFrame({'brand': ratings.index.astype(str), 'rating': ratings.to_numpy()})
+        yield {'id': 'brand_performance', 'title': "1. Brand Performance Analysis", 'blocks': [
+            {'type': 'heading', 'text': "Top Brands by Number of Products"},
+            {'type': 'image', 'alt': "Top Brands", 'path': brand_results['top_brands_chart']},
+            {'type': 'bullets', 'title': "Key Insights", 'items': [
+                f"The market is dominated by {stats.top_brand}",
+                f"Top 5 brands account for {stats.top_brands_share:.1f}% of the sponsored products",
+            ]},
+            {'type': 'heading', 'text': "Brand Market Share"},
+            {'type': 'image', 'alt': "Brand Share", 'path': brand_results['brand_share_chart']},
+            {'type': 'heading', 'text': "Average Rating by Brand (Top 10)"},
+            report_table(brand_ratings, {
+                'Brand': ('brand', '{}'),
+                'Average Rating': ('rating', '{:.2f}'),
+            }),
+        ]}
+
+        # Price vs Rating
+        price_rating_results = self.price_vs_rating()
+        value = price_rating_results['value_products']
+        yield {'id': 'price_vs_rating', 'title': "2. Price vs Rating Analysis", 'blocks': [
+            {'type': 'heading', 'text': "Price vs Rating Scatter Plot"},
+            {'type': 'image', 'alt': "Price vs Rating", 'path': price_rating_results['price_rating_scatter']},
+            {'type': 'bullets', 'title': "Key Insights", 'items': [
+                "There's a wide range of prices across different rating levels",
+                "Most highly-rated products (4.5+) are distributed across various price points",
+            ]},
+            {'type': 'heading', 'text': "Average Price by Rating Range"},
+            {'type': 'image', 'alt': "Price by Rating", 'path': price_rating_results['price_by_rating_chart']},
+            {'type': 'heading', 'text': "Value for Money Products (High Rating, Low Price)"},
+            report_table(value, {
+                'Product': ('product_title', '{:.50}...'),
+                'Brand': ('brand', '{}'),
+                'Rating': ('rating', '{:.1f}'),
+                'Price (₹)': ('selling_price', '{:.2f}'),
+                'Reviews': ('num_reviews', '{}'),
+            }),
+        ]}
+
+        # Review & Rating Distribution
+        review_results = self.review_rating_distribution()
+        yield {'id': 'reviews_ratings', 'title': "3. Reviews and Ratings Analysis", 'blocks': [
+            {'type': 'heading', 'text': "Top Products by Number of Reviews"},
+            {'type': 'image', 'alt': "Top Reviewed", 'path': review_results['top_reviews_chart']},
+            {'type': 'bullets', 'title': "Key Insights", 'items': [
+                "The most reviewed product has significantly more reviews than others",
+                "Products with high review counts indicate popular items with established market presence",
+            ]},
+            {'type': 'heading', 'text': "Top Rated Products"},
+            {'type': 'image', 'alt': "Top Rated", 'path': review_results['top_rated_chart']},
+            {'type': 'bullets', 'title': "Key Insights", 'items': [
+                "Top rated products maintain exceptional customer satisfaction",
+                "Several products achieve near-perfect ratings despite having multiple reviews",
+            ]},
+        ]}
+
+        # Summary
+        yield {'id': 'summary', 'title': "4. Summary and Recommendations", 'blocks': [
+            {'type': 'bullets', 'title': "Market Insights", 'items': [
+                "The sponsored soft toys market appears to be dominated by a few key brands",
+                "There are several high-quality options (high ratings) available at various price points",
+                "Products with high review counts and high ratings represent established market leaders",
+            ]},
+            {'type': 'bullets', 'title': "Recommendations", 'items': [
+                "For value-conscious consumers, focus on the 'Value for Money' products section",
+                "For gift-giving, consider the top-rated products with substantial review counts",
+                f"For brand loyalty and consistency, {stats.top_brand} offers the widest selection of sponsored products",
+            ]},
+        ]}
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Scrape, clean and analyze Amazon sponsored products")
+    parser.add_argument('--stage', default='all', choices=['all', 'scrape', 'clean', 'analyze'],
+                        help="run one stage on its own; clean and analyze read --input")
+    parser.add_argument('--input', help="raw products for --stage clean, cleaned products for --stage analyze")
+    parser.add_argument('--search-term', default="soft toys",
+                        help="search term for a single-term crawl or replay, and the term the history "
+                             "store records for products saved without one")
+    parser.add_argument('--terms', nargs='+', help="search terms to crawl as one batch")
+    parser.add_argument('--terms-file', help="file with one search term per line")
+    parser.add_argument('--pages', type=int, default=3, help="result pages per search term")
+    parser.add_argument('--concurrent', action='store_true',
+                        help="fetch a single search term's pages concurrently instead of one by one")
+    parser.add_argument('--io-workers', type=int, default=8, help="concurrent fetch workers for batches")
+    parser.add_argument('--parse-workers', type=int, default=None, help="parser processes for batches")
+    parser.add_argument('--parser', default='bs4', choices=sorted(PARSER_BACKENDS),
+                        help="HTML parser backend used to extract products")
+    parser.add_argument('--streaming', action='store_true',
+                        help="parse result cards one at a time instead of the whole page")
+    parser.add_argument('--archive-dir',
+                        help="archive raw pages (compressed, content-addressed) in this directory")
+    parser.add_argument('--replay-archive',
+                        help="extract products from a page archive instead of fetching")
+    parser.add_argument('--cache-dir', help="cache HTTP responses in this directory")
+    parser.add_argument('--cache-ttl', type=int, default=3600,
+                        help="seconds a cached response is used without revalidation")
+    parser.add_argument('--rate', type=float,
+                        help="start at this many requests/sec and adapt to throttling instead of fixed sleeps")
+    parser.add_argument('--max-rate', type=float, default=10.0,
+                        help="upper bound for the adaptive request rate")
+    parser.add_argument('--rate-metrics', help="write the adaptive rate limiter metrics to this JSON file")
+    parser.add_argument('--card-memo',
+                        help="reuse products of unchanged result cards from this memo file, and update it")
+    parser.add_argument('--card-memo-size', type=int, default=20_000,
+                        help="most cards the memo keeps, least recently seen dropped first")
+    parser.add_argument('--chunksize', type=int,
+                        help="clean the raw CSV in chunks of this many rows instead of loading it whole")
+    parser.add_argument('--format', default='csv', choices=['csv', 'parquet'],
+                        help="storage format for raw and cleaned products")
+    parser.add_argument('--history-db',
+                        help="upsert the cleaned crawl into this SQLite history store")
+    parser.add_argument('--sketch',
+                        help="fold the cleaned crawl into this summary sketch and report from all crawls in it")
+    parser.add_argument('--report-formats', nargs='+', default=['md'], choices=sorted(REPORT_WRITERS),
+                        help="write the report in these formats, section by section as each is ready")
+    parser.add_argument('--metrics-file',
+                        help="write pipeline metrics here: JSON for a .json path, Prometheus text otherwise")
+    parser.add_argument('--profile', nargs='+', default=[], choices=['scrape', 'clean', 'analyze'],
+                        help="run these stages under cProfile")
+    parser.add_argument('--profile-dir', default='profiles', help="where --profile writes .prof files")
+    parser.add_argument('--journal', default='batch_journal.jsonl',
+                        help="batch journal used to resume an interrupted batch")
+    return parser.parse_args(argv)
+
+def scrape_stage(args):
+    """Fetch (or replay) search pages and save the raw products; returns (raw file path, crawl id)"""
+    archive = PageArchive(args.archive_dir) if args.archive_dir else None
+    cache = ResponseCache(args.cache_dir, ttl=args.cache_ttl) if args.cache_dir else None
+    rate_limiter = AdaptiveRateLimiter(
+        args.rate, max_rate=args.max_rate,
+        throttle_status_codes=AmazonSponsoredScraper.THROTTLE_STATUS_CODES) if args.rate else None
+    card_memo = CardMemo(args.card_memo_size, path=args.card_memo) if args.card_memo else None
+    crawl_id = uuid.uuid4().hex
+    fetch_stats = []
+
+    if args.replay_archive:
+        scraper = AmazonSponsoredScraper(args.search_term, parser_backend=args.parser,
+                                         streaming=args.streaming, card_memo=card_memo)
+        print(f"Replaying archived pages from {args.replay_archive}...")
+        scraper.products = PageArchive(args.replay_archive).replay(scraper)
+        raw_csv = scraper.save_to_csv(file_format=args.format, crawl_id=crawl_id)
+    elif args.terms or args.terms_file:
+        batch_kwargs = dict(num_pages=args.pages, io_workers=args.io_workers,
+                            parse_workers=args.parse_workers, journal_path=args.journal,
+                            parser_backend=args.parser, streaming=args.streaming,
+                            archive=archive, cache=cache, rate_limiter=rate_limiter,
+                            card_memo=card_memo)
+        if args.terms_file:
+            crawler = BatchCrawler.from_file(args.terms_file, **batch_kwargs)
+        else:
+            crawler = BatchCrawler(args.terms, **batch_kwargs)
+        print(f"Starting batch crawl for {len(crawler.search_terms)} search terms...")
+        crawler.run()
+        print(f"Batch summary: {crawler.summary()}")
+        fetch_stats = [scraper.fetch_stats for scraper in crawler.scrapers.values()]
+        raw_csv = crawler.save_to_csv(file_format=args.format, crawl_id=crawl_id)
+    else:
+        search_term = args.search_term
+        print(f"Starting Amazon sponsored product scraper for '{search_term}'...")
+        scraper = AmazonSponsoredScraper(search_term, num_pages=args.pages,
+                                         parser_backend=args.parser, streaming=args.streaming,
+                                         archive=archive, cache=cache, rate_limiter=rate_limiter,
+                                         card_memo=card_memo)
+        scraper.scrape(concurrent=args.concurrent)
+        print(f"Fetch stats: {scraper.fetch_stats.summary()}")
+        fetch_stats = [scraper.fetch_stats]
+        raw_csv = scraper.save_to_csv(file_format=args.format, crawl_id=crawl_id)
+
+    if archive is not None:
+        archive.close()
+    if cache is not None:
+        print(f"Cache stats: {cache.summary()}")
+    if card_memo is not None:
+        print(f"Card memo: {card_memo.summary()}")
+        card_memo.save()
+    if rate_limiter is not None:
+        metrics = rate_limiter.metrics()
+        for name, value in metrics.items():
+            if value is not None:
+                METRICS.set(f"rate_limiter_{name}", value)
+        print(f"Rate limiter: {metrics}")
+        if args.rate_metrics:
+            with open(args.rate_metrics, 'w', encoding='utf-8') as f:
+                json.dump(metrics, f, indent=2)
+    blocked_pages = sum(stats.blocked for stats in fetch_stats)
+    if blocked_pages:
+        print(f"Warning: Amazon served {blocked_pages} robot check pages during this crawl")
+    return raw_csv, crawl_id
+
+def clean_stage(args, raw_csv, crawl_id=None):
+    """Clean raw products (only crawl_id's rows of a raw dataset, when given) and save them;
+    returns (cleaned rows for analysis, cleaned file path)"""
+    print("\nCleaning the scraped data...")
+    if args.chunksize:
+        cleaner = DataCleaner(raw_csv, chunksize=args.chunksize, crawl_id=crawl_id)
+        cleaned_csv = cleaner.clean_chunked()
+        cleaned_df = load_products(cleaned_csv, columns=DataAnalyzer.ANALYSIS_COLUMNS)
+    else:
+        cleaner = DataCleaner(raw_csv, crawl_id=crawl_id)
+        cleaned_df = cleaner.clean()
+        cleaned_csv = cleaner.save_cleaned_data()
+
+    if args.history_db:
+        history = HistoryStore(args.history_db)
+        if args.chunksize:
+            for chunk in iter_product_chunks(cleaned_csv, args.chunksize):
+                history.record_crawl(chunk, search_term=args.search_term)
+        else:
+            history.record_crawl(cleaner.df, search_term=args.search_term)
+        history.close()
+    return cleaned_df, cleaned_csv
+
+def analyze_stage(args, cleaned_df, cleaned_csv):
+    """Build the report from cleaned products (or the accumulated sketch); returns its path"""
+    print("\nPerforming data analysis and visualization...")
+    # Lazy only for the scrape and clean stages; the report always draws charts
+    _plotting()
+    if args.sketch:
+        sketch = AnalyticsSketch.load(args.sketch)
+        if args.chunksize:
+            for chunk in iter_product_chunks(cleaned_csv, args.chunksize):
+                sketch.update(chunk)
+        else:
+            sketch.update(cleaned_df)
+        sketch.save(args.sketch)
+        print(f"Summary sketch now covers {sketch.crawls} crawls, {sketch.total_products} products")
+        analyzer = DataAnalyzer(sketch=sketch)
+    else:
+        analyzer = DataAnalyzer(cleaned_df)
+    return analyzer.generate_report(formats=args.report_formats)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.metrics_file or args.profile:
+        METRICS.enable(profile_stages=args.profile, profile_dir=args.profile_dir)
+    if args.stage != 'all' and args.stage != 'scrape' and not args.input:
+        raise SystemExit(f"--stage {args.stage} needs --input")
+    try:
+        _run_stages(args)
+    finally:
+        if args.metrics_file:
+            print(f"Metrics written to {METRICS.write(args.metrics_file)}")
+
+def _run_stages(args):
     # 1. Scraping
-    search_term = "soft toys"
-    print(f"Starting Amazon sponsored product scraper for '{search_term}'...")
-    scraper = AmazonSponsoredScraper(search_term, num_pages=3)
-    scraper.scrape()
-    raw_csv = scraper.save_to_csv()
-    
+    if args.stage == 'clean':
+        # An explicit input is cleaned whole, every crawl it holds
+        raw_csv, crawl_id = args.input, None
+    elif args.stage in ('all', 'scrape'):
+        with METRICS.stage('scrape'):
+            raw_csv, crawl_id = scrape_stage(args)
+        if args.stage == 'scrape':
+            print(f"\nScrape stage complete, raw products saved to {raw_csv}")
+            return
+
     # 2. Cleaning
-    print("\nCleaning the scraped data...")
-    cleaner = DataCleaner(raw_csv)
-    cleaned_df = cleaner.clean()
-    cleaned_csv = cleaner.save_cleaned_data()
-    
+    if args.stage == 'analyze':
+        cleaned_csv = args.input
+        cleaned_df = load_products(cleaned_csv, columns=DataAnalyzer.ANALYSIS_COLUMNS)
+    else:
+        with METRICS.stage('clean'):
+            cleaned_df, cleaned_csv = clean_stage(args, raw_csv, crawl_id)
+        if args.stage == 'clean':
+            print(f"\nClean stage complete, cleaned products saved to {cleaned_csv}")
+            return
+
     # Check if we have any data
     if cleaned_df.empty:
         print("\nNo sponsored products were found. This could be due to:")
@@ -529,12 +3318,11 @@ def main():
         print("- Add more randomized delays between requests")
         print("- Update the HTML selectors in the code")
         return
-    
+
     # 3. Analysis
-    print("\nPerforming data analysis and visualization...")
-    analyzer = DataAnalyzer(cleaned_df)
-    report_file = analyzer.generate_report()
-    
+    with METRICS.stage('analyze'):
+        report_file = analyze_stage(args, cleaned_df, cleaned_csv)
+
     print(f"\nComplete! Analysis report saved to {report_file}")
     print("You can find all visualizations in the 'amazon_analysis_output' directory")
 
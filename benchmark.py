@@ -0,0 +1,1143 @@
+import argparse
+import asyncio
+import contextlib
+import glob
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+import app
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def load_fixtures(fixtures_dir=FIXTURES_DIR):
+    """Load saved search result pages, keyed by file name"""
+    pages = {}
+    for path in sorted(glob.glob(os.path.join(fixtures_dir, '*.html'))):
+        with open(path, encoding='utf-8') as f:
+            pages[os.path.basename(path)] = f.read()
+    return pages
+
+
+def synthetic_raw_products(n, seed=0):
+    """Raw scraped-product rows as extract_sponsored_products produces them, at any scale"""
+    rng = np.random.default_rng(seed)
+    brands = np.array([f"Brand {i}" for i in range(50)] + [f"  Brand {i} " for i in range(5)] + ["N/A"],
+                      dtype=object)
+    ratings = np.array([f"{r:.1f}" for r in np.arange(1.0, 5.01, 0.1)] + ["N/A"], dtype=object)
+    reviews = np.array([f"{r:,}" for r in rng.integers(0, 250000, 1000)] + ["(87)", "0"], dtype=object)
+    prices = np.array([f"₹{p:,}" for p in rng.integers(99, 9999, 1000)] + ["N/A"], dtype=object)
+
+    # About 10% of rows repeat an earlier title so de-duplication has work to do
+    title_ids = rng.integers(0, max(1, int(n * 0.9)), n)
+    asins = pd.Series(title_ids).astype(str).str.zfill(8)
+    return pd.DataFrame({
+        'product_title': "Soft Toy Teddy Bear " + asins,
+        'brand': brands[rng.integers(0, len(brands), n)],
+        'rating': ratings[rng.integers(0, len(ratings), n)],
+        'num_reviews': reviews[rng.integers(0, len(reviews), n)],
+        'selling_price': prices[rng.integers(0, len(prices), n)],
+        'image_url': "https://m.media-amazon.com/images/I/" + asins + ".jpg",
+        'product_url': "https://www.amazon.in/dp/B0" + asins,
+    })
+
+
+def edge_case_raw_products():
+    """Rows whose numbers Python's float()/int() read but pd.to_numeric rejects"""
+    values = [
+        # selling_price, rating, num_reviews
+        ("₹1_000", "4_5 out of 5 stars", "1_234"),
+        ("₹१,२३४", "४.५ out of 5 stars", "१२३"),
+        ("१२३", "٤", "(٣٤)"),
+        (" 499 ", " 4.0", "N/A"),
+        ("₹\u00a0799", "3.5\u00a0out of 5 stars", "2,345\u00a0ratings"),
+    ]
+    return pd.DataFrame({
+        'product_title': [f"Edge Case Toy {i}" for i in range(len(values))],
+        'brand': "Brand 0",
+        'rating': [rating for _, rating, _ in values],
+        'num_reviews': [reviews for _, _, reviews in values],
+        'selling_price': [price for price, _, _ in values],
+        'image_url': "https://m.media-amazon.com/images/I/edge.jpg",
+        'product_url': [f"https://www.amazon.in/dp/EDGE{i}" for i in range(len(values))],
+    })
+
+
+def edge_case_columns():
+    """Whole-column edge cases, cleaned on their own since they would not survive a concat:
+    name -> raw frame. Read from CSV, "N/A" arrives as missing rather than as a string."""
+    all_na_price = edge_case_raw_products()
+    all_na_price['selling_price'] = "N/A"
+    all_bad_price = edge_case_raw_products()
+    all_bad_price['selling_price'] = "call for price"
+    return {'all N/A prices': all_na_price, 'all unparseable prices': all_bad_price}
+
+
+def edge_case_parity():
+    """Clean each whole-column edge case row-wise and vectorized, from a DataFrame and
+    from CSV; returns the names of the cases whose outputs differ"""
+    mismatches = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, raw in edge_case_columns().items():
+            raw_csv = os.path.join(tmp, 'raw.csv')
+            raw.to_csv(raw_csv, index=False)
+            for source, make_cleaner in (('DataFrame', lambda: app.DataCleaner.from_dataframe(raw)),
+                                         ('CSV', lambda: app.DataCleaner(raw_csv))):
+                with quiet():
+                    rowwise = make_cleaner().clean(vectorized=False)
+                    vectorized = make_cleaner().clean(vectorized=True)
+                try:
+                    pd.testing.assert_frame_equal(rowwise, vectorized)
+                except AssertionError as e:
+                    print(f"OUTPUT MISMATCH for {name} from {source}: {e}")
+                    mismatches.append(f"{name} ({source})")
+    return mismatches
+
+
+def available_backends():
+    """Parser backends whose optional dependencies are installed"""
+    names = []
+    for name in app.PARSER_BACKENDS:
+        try:
+            app.get_parser_backend(name)
+        except ImportError as e:
+            print(f"Skipping parser backend '{name}': {e}")
+            continue
+        names.append(name)
+    return names
+
+
+@contextlib.contextmanager
+def quiet():
+    """Silence the pipeline's progress prints while timing it"""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def stdlib_parser_reads_textarea_as_text():
+    """Whether this Python's html.parser, behind the 'bs4' backend, reads <textarea>
+    content as text like browsers and lxml do; older Pythons end elements at tags in it"""
+    from html.parser import HTMLParser
+    end_tags = []
+
+    class Probe(HTMLParser):
+        def handle_endtag(self, tag):
+            end_tags.append(tag)
+
+    Probe().feed('<textarea></div></textarea>')
+    return 'div' not in end_tags
+
+
+def check_parser_parity(pages, backends, reference='bs4'):
+    """Check every backend returns exactly the reference backend's products; return mismatches"""
+    scrapers = {name: app.AmazonSponsoredScraper('soft toys', parser_backend=name) for name in backends}
+    textarea_as_text = stdlib_parser_reads_textarea_as_text()
+    mismatches = []
+    for fixture, html_content in pages.items():
+        names = backends
+        if not textarea_as_text and '<textarea' in html_content and 'bs4' in backends:
+            print(f"Leaving 'bs4' out of parity on {fixture}: this Python's html.parser "
+                  f"reads tags inside <textarea> as markup")
+            names = [name for name in backends if name != 'bs4']
+        if not names:
+            continue
+        page_reference = reference if reference in names else names[0]
+        with quiet():
+            expected = scrapers[page_reference].extract_sponsored_products(html_content)
+            for name in names:
+                actual = scrapers[name].extract_sponsored_products(html_content)
+                if actual != expected:
+                    mismatches.append({'fixture': fixture, 'backend': name,
+                                       'expected': expected, 'actual': actual})
+    return mismatches
+
+
+def bench_parsers(pages, backends, repeat=20):
+    """Pages per second for each parser backend over the fixture pages"""
+    results = {}
+    with quiet():
+        for name in backends:
+            scraper = app.AmazonSponsoredScraper('soft toys', parser_backend=name)
+            started = time.perf_counter()
+            for _ in range(repeat):
+                for html_content in pages.values():
+                    scraper.extract_sponsored_products(html_content)
+            elapsed = time.perf_counter() - started
+            results[name] = {'pages': repeat * len(pages), 'seconds': round(elapsed, 4),
+                             'pages_per_sec': round(repeat * len(pages) / elapsed, 1)}
+    return results
+
+
+def measure_extraction(scraper, pages, repeat):
+    """Seconds per page for an extraction mode"""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for html_content in pages.values():
+            scraper.extract_sponsored_products(html_content)
+    elapsed = time.perf_counter() - started
+    return elapsed / (repeat * len(pages))
+
+
+def _extraction_in_child(pages_path, backend, streaming, results):
+    """Extract every page in a fresh process; reports how far extraction raised peak RSS.
+    RSS, unlike tracemalloc, includes the C allocations of lxml and selectolax trees."""
+    with open(pages_path, encoding='utf-8') as f:
+        pages = json.load(f)
+    scraper = app.AmazonSponsoredScraper('soft toys', parser_backend=backend, streaming=streaming)
+    baseline = _peak_rss_kb()
+    with quiet():
+        for html_content in pages:
+            scraper.extract_into(html_content, app.ProductBatch())
+    results.put(_peak_rss_kb() - baseline)
+
+
+def measure_extraction_rss(pages, backend, streaming):
+    """Peak RSS growth, in KB, of extracting the pages in one mode, in a spawned process"""
+    ctx = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory() as tmp:
+        pages_path = os.path.join(tmp, 'pages.json')
+        with open(pages_path, 'w', encoding='utf-8') as f:
+            json.dump(list(pages.values()), f)
+        results = ctx.Queue()
+        child = ctx.Process(target=_extraction_in_child, args=(pages_path, backend, streaming, results))
+        child.start()
+        growth = results.get()
+        child.join()
+    return growth
+
+
+def page_chrome(size_kb):
+    """Navigation, inline script and widget markup like the non-result part of a real page"""
+    block = ('<div class="nav-flyout"><ul>' + '<li><a href="/gp/browse?node=1">Category</a></li>' * 20 +
+             '</ul></div><script type="text/javascript">P.when("A").execute(function(A){' +
+             'var config = {"widgets": [1, 2, 3], "ref": "nav_cs"};});</script>'
+             '<div class="s-widget"><span class="a-text-bold">Customers also viewed</span></div>')
+    return block * max(1, size_kb * 1024 // len(block))
+
+
+def run_streaming(args):
+    pages = load_fixtures(args.fixtures)
+    if args.chrome_kb:
+        # Real search pages carry far more markup around the result cards than the fixtures do
+        chrome = page_chrome(args.chrome_kb)
+        pages = {name: html.replace('<body>', '<body>' + chrome, 1).replace('</body>', chrome + '</body>', 1)
+                 for name, html in pages.items()}
+
+    results = {}
+    ok = True
+    with quiet():
+        for name in available_backends():
+            whole = app.AmazonSponsoredScraper('soft toys', parser_backend=name)
+            streaming = app.AmazonSponsoredScraper('soft toys', parser_backend=name, streaming=True)
+            same = all(whole.extract_sponsored_products(html) == streaming.extract_sponsored_products(html)
+                       for html in pages.values())
+            ok = ok and same
+
+            whole_time = measure_extraction(whole, pages, args.repeat)
+            stream_time = measure_extraction(streaming, pages, args.repeat)
+            whole_peak = measure_extraction_rss(pages, name, False)
+            stream_peak = measure_extraction_rss(pages, name, True)
+            results[name] = {
+                'same_products': same,
+                'whole_page_ms': round(whole_time * 1000, 3),
+                'streaming_ms': round(stream_time * 1000, 3),
+                'speedup': round(whole_time / stream_time, 2),
+                'whole_page_rss_growth_kb': whole_peak,
+                'streaming_rss_growth_kb': stream_peak,
+                'memory_saving': round(1 - stream_peak / whole_peak, 3) if whole_peak else 0.0,
+            }
+
+    for name, result in results.items():
+        print(f"{name:>12}: {result['whole_page_ms']:.2f} ms -> {result['streaming_ms']:.2f} ms per page "
+              f"({result['speedup']}x), peak RSS growth {result['whole_page_rss_growth_kb']} KB -> "
+              f"{result['streaming_rss_growth_kb']} KB ({100 * result['memory_saving']:.0f}% less)"
+              f"{'' if result['same_products'] else '  PRODUCTS DIFFER'}")
+    return {'streaming': results}, ok
+
+
+def run_memo(args):
+    pages = load_corpus(args.fixtures, args.synthetic_pages)
+    results = {}
+    ok = True
+    with quiet():
+        for name in available_backends():
+            plain = app.AmazonSponsoredScraper('soft toys', parser_backend=name)
+            expected = [plain.extract_sponsored_products(html) for html in pages]
+            started = time.perf_counter()
+            for html_content in pages:
+                plain.extract_sponsored_products(html_content)
+            plain_seconds = time.perf_counter() - started
+
+            memo = app.CardMemo(max_entries=args.max_entries)
+            scraper = app.AmazonSponsoredScraper('soft toys', parser_backend=name, card_memo=memo)
+            passes = {}
+            same = True
+            for label in ('cold', 'warm'):
+                started = time.perf_counter()
+                products = [scraper.extract_sponsored_products(html) for html in pages]
+                passes[label] = time.perf_counter() - started
+                same = same and products == expected
+                summary = memo.summary()
+                results.setdefault(name, {})[f'{label}_hit_rate'] = summary['hit_rate']
+                memo.hits = memo.misses = 0
+
+            ok = ok and same
+            results[name].update({
+                'same_products': same,
+                'plain_pages_per_sec': round(len(pages) / plain_seconds, 1),
+                'cold_pages_per_sec': round(len(pages) / passes['cold'], 1),
+                'warm_pages_per_sec': round(len(pages) / passes['warm'], 1),
+                'warm_speedup': round(plain_seconds / passes['warm'], 2),
+                'memo_entries': summary['entries'],
+            })
+
+    for name, result in results.items():
+        print(f"{name:>12}: {result['plain_pages_per_sec']:>8.1f} pages/sec plain, "
+              f"{result['cold_pages_per_sec']:>8.1f} cold ({100 * result['cold_hit_rate']:.0f}% hits), "
+              f"{result['warm_pages_per_sec']:>8.1f} warm ({100 * result['warm_hit_rate']:.0f}% hits, "
+              f"{result['warm_speedup']}x){'' if result['same_products'] else '  PRODUCTS DIFFER'}")
+    return {'memo': results}, ok
+
+
+def run_cache(args):
+    from local_server import CannedPageServer
+
+    with tempfile.TemporaryDirectory() as cache_dir, CannedPageServer() as server, quiet():
+        cache = app.ResponseCache(cache_dir, ttl=3600)
+        scraper = app.AmazonSponsoredScraper('soft toys', num_pages=args.pages,
+                                             base_url=server.base_url, cache=cache)
+        started = time.perf_counter()
+        cold_products = asyncio.run(scraper.scrape_async(min_delay=0, max_delay=0))
+        cold_seconds = time.perf_counter() - started
+        cold_requests = server.requests_served
+
+        started = time.perf_counter()
+        warm_products = scraper.scrape()
+        warm_seconds = time.perf_counter() - started
+        warm_requests = server.requests_served - cold_requests
+
+        # Expire everything so the next run revalidates with If-None-Match and gets 304s
+        cache.ttl = 0
+        started = time.perf_counter()
+        revalidated_products = asyncio.run(scraper.scrape_async(min_delay=0, max_delay=0))
+        revalidate_seconds = time.perf_counter() - started
+        stats = cache.summary()
+
+    results = {
+        'pages': args.pages,
+        'cold_seconds': round(cold_seconds, 3),
+        'cached_seconds': round(warm_seconds, 3),
+        'cached_network_requests': warm_requests,
+        'revalidate_seconds': round(revalidate_seconds, 3),
+        'cache': stats,
+    }
+    ok = warm_requests == 0 and cold_products == warm_products == revalidated_products
+    print(f"{args.pages} pages: cold {cold_seconds:.3f}s, cached {warm_seconds:.3f}s "
+          f"with {warm_requests} network requests, revalidated {revalidate_seconds:.3f}s")
+    print(f"Cache: {stats}")
+    return {'cache': results}, ok
+
+
+def run_concurrent(args):
+    """Sequential vs concurrent scrape() of one search term against a slow local server"""
+    from local_server import CannedPageServer
+
+    timings = {}
+    products = {}
+    with CannedPageServer(delay=args.delay) as server, quiet():
+        for mode, concurrent in (('sequential', False), ('concurrent', True)):
+            # A limiter far above the server's pace zeroes the scheduler's 2-5 s politeness delays
+            limiter = app.AdaptiveRateLimiter(rate=1000, max_rate=1000, burst=1000)
+            scraper = app.AmazonSponsoredScraper('soft toys', num_pages=args.pages,
+                                                 base_url=server.base_url, rate_limiter=limiter)
+            started = time.perf_counter()
+            products[mode] = scraper.scrape(concurrent=concurrent)
+            timings[mode] = time.perf_counter() - started
+
+    same = len(products['sequential']) > 0 and products['sequential'] == products['concurrent']
+    results = {
+        'pages': args.pages,
+        'server_delay': args.delay,
+        'products': len(products['sequential']),
+        'same_products': same,
+        'sequential_seconds': round(timings['sequential'], 3),
+        'concurrent_seconds': round(timings['concurrent'], 3),
+        'speedup': round(timings['sequential'] / timings['concurrent'], 2),
+    }
+    print(f"{args.pages} pages at {args.delay}s each: sequential {results['sequential_seconds']}s, "
+          f"concurrent {results['concurrent_seconds']}s ({results['speedup']}x), "
+          f"{results['products']} products{'' if same else ', PRODUCTS DIFFER'}")
+    return {'concurrent': results}, same
+
+
+def run_throttle(args):
+    """Crawl a throttling local server with a fixed-rate and an adaptive token bucket"""
+    from local_server import CannedPageServer
+
+    results = {}
+    ok = True
+    for block_mode in ('429', 'captcha'):
+        for label, limiter_kwargs in (
+                ('fixed', dict(rate=args.start_rate, min_rate=args.start_rate, max_rate=args.start_rate)),
+                ('adaptive', dict(rate=args.start_rate, max_rate=args.server_rate * 4))):
+            server = CannedPageServer(rate_limit=args.server_rate, burst=args.server_burst,
+                                      block_mode=block_mode, overload_delay=0.02)
+            with server, quiet():
+                limiter = app.AdaptiveRateLimiter(**limiter_kwargs)
+                scraper = app.AmazonSponsoredScraper('soft toys', num_pages=args.pages, max_retries=5,
+                                                     failure_threshold=args.pages,
+                                                     base_url=server.base_url, rate_limiter=limiter)
+                started = time.perf_counter()
+                scraper.scrape()
+                seconds = time.perf_counter() - started
+            stats = scraper.fetch_stats.summary()
+            pages_ok = stats['requests'] - server.throttled_served
+            results[f"{block_mode}_{label}"] = result = {
+                'seconds': round(seconds, 3),
+                'pages_ok': pages_ok,
+                'pages_failed': stats['failures'],
+                'requests': stats['requests'],
+                'refused': server.throttled_served,
+                'refused_fraction': round(server.throttled_served / max(1, stats['requests']), 3),
+                'pages_per_second': round(pages_ok / seconds, 2),
+                'limiter': limiter.metrics(),
+            }
+            print(f"{block_mode:>7} {label:>8}: {pages_ok}/{args.pages} pages in {seconds:.2f}s "
+                  f"({result['pages_per_second']} pages/s), {server.throttled_served} refused "
+                  f"({result['refused_fraction']:.0%}), final rate {limiter.rate:.2f}/s")
+
+        # The adaptive limiter should settle near the server's limit and get refused less often
+        adaptive, fixed = results[f"{block_mode}_adaptive"], results[f"{block_mode}_fixed"]
+        ok = ok and adaptive['pages_failed'] == 0 and adaptive['refused_fraction'] < fixed['refused_fraction']
+    if not ok:
+        print("MISMATCH: the adaptive limiter did not back off from the throttling server")
+    return {'throttle': results}, ok
+
+
+def run_clean(args):
+    results = {}
+    ok = True
+    for n in args.sizes:
+        # The edge cases ride along so the parity check covers them at every size
+        raw = pd.concat([synthetic_raw_products(n), edge_case_raw_products()], ignore_index=True)
+        timings = {}
+        outputs = {}
+        for mode, vectorized in (('rowwise', False), ('vectorized', True)):
+            if mode == 'rowwise' and args.rowwise_max and n > args.rowwise_max:
+                continue
+            cleaner = app.DataCleaner.from_dataframe(raw)
+            with quiet():
+                started = time.perf_counter()
+                outputs[mode] = cleaner.clean(vectorized=vectorized)
+                timings[mode] = time.perf_counter() - started
+
+        result = {f"{mode}_seconds": round(seconds, 3) for mode, seconds in timings.items()}
+        result.update({f"{mode}_rows_per_sec": round(n / seconds) for mode, seconds in timings.items()})
+        if 'rowwise' in outputs:
+            try:
+                pd.testing.assert_frame_equal(outputs['rowwise'], outputs['vectorized'])
+                result['identical'] = True
+            except AssertionError as e:
+                print(f"OUTPUT MISMATCH at {n} rows: {e}")
+                result['identical'] = False
+                ok = False
+            result['speedup'] = round(timings['rowwise'] / timings['vectorized'], 1)
+        results[n] = result
+
+        line = f"{n:>10,} rows: vectorized {timings['vectorized']:.3f}s"
+        if 'rowwise' in timings:
+            line += f", row-wise {timings['rowwise']:.3f}s ({result['speedup']}x, identical={result['identical']})"
+        print(line)
+
+    mismatches = edge_case_parity()
+    print(f"Whole-column edge cases: {'all identical' if not mismatches else 'DIFFER'}")
+    results['edge_case_mismatches'] = mismatches
+    return {'clean': results}, ok and not mismatches
+
+
+def _peak_rss_kb():
+    """Peak resident set size of this process in KB"""
+    # Linux keeps ru_maxrss across fork+exec, so a spawned child would report its
+    # parent's peak; VmHWM belongs to the current address space only
+    with contextlib.suppress(OSError):
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    import resource
+    # ru_maxrss is KB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def _clean_in_child(raw_csv, chunksize, results):
+    """Clean in a fresh process so its peak RSS reflects only this cleaning mode"""
+    baseline = _peak_rss_kb()
+    started = time.perf_counter()
+    with quiet():
+        if chunksize:
+            app.DataCleaner(raw_csv, chunksize=chunksize).clean_chunked(raw_csv + '.chunked.csv')
+        else:
+            cleaner = app.DataCleaner(raw_csv)
+            cleaner.clean()
+            cleaner.save_cleaned_data(raw_csv + '.whole.csv')
+    results.put({'seconds': time.perf_counter() - started,
+                 'peak_rss_mb': round(_peak_rss_kb() / 1024, 1),
+                 'import_rss_mb': round(baseline / 1024, 1)})
+
+
+def cleaning_parity(raw_csv, chunksize):
+    """Whether whole-file and chunked cleaning of a raw CSV produce the same rows"""
+    with quiet():
+        whole = app.DataCleaner(raw_csv).clean().reset_index(drop=True)
+        chunked_csv = app.DataCleaner(raw_csv, chunksize=chunksize).clean_chunked(raw_csv + '.parity.csv')
+    return whole.astype(str).equals(pd.read_csv(chunked_csv).astype(str))
+
+
+def run_chunked(args):
+    ctx = multiprocessing.get_context('spawn')
+    results = {}
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        # Recorded pages have all-numeric ratings, which read_csv would infer as floats
+        fixture_csv = os.path.join(tmp, 'fixtures_raw.csv')
+        with quiet():
+            scraper = app.AmazonSponsoredScraper('soft toys')
+            products = app.ProductBatch()
+            for html_content in load_corpus(FIXTURES_DIR):
+                scraper.extract_into(html_content, products)
+        products.to_csv(fixture_csv)
+        ok = cleaning_parity(fixture_csv, 5)
+        results['fixtures_same_output'] = ok
+        print(f"Fixture products: whole-file and chunked cleaning {'agree' if ok else 'DIFFER'}")
+
+        for n in args.sizes:
+            raw_csv = os.path.join(tmp, f'raw_{n}.csv')
+            synthetic_raw_products(n).to_csv(raw_csv, index=False)
+            file_mb = os.path.getsize(raw_csv) / 1024 / 1024
+
+            modes = {}
+            for mode, chunksize in (('whole', None), ('chunked', args.chunksize)):
+                queue = ctx.Queue()
+                child = ctx.Process(target=_clean_in_child, args=(raw_csv, chunksize, queue))
+                child.start()
+                modes[mode] = queue.get()
+                child.join()
+
+            # Both modes read the raw file with the same dtypes, so they must clean it identically
+            whole = pd.read_csv(raw_csv + '.whole.csv', dtype=str)
+            chunked = pd.read_csv(raw_csv + '.chunked.csv', dtype=str)
+            same = whole.equals(chunked)
+            ok = ok and same
+
+            results[n] = {'file_mb': round(file_mb, 1), 'chunksize': args.chunksize, 'same_output': same, **{
+                f"{mode}_{key}": round(value, 3) if isinstance(value, float) else value
+                for mode, stats in modes.items() for key, value in stats.items()}}
+            print(f"{n:>10,} rows ({file_mb:.0f} MB): whole-file peak {modes['whole']['peak_rss_mb']} MB "
+                  f"in {modes['whole']['seconds']:.2f}s, chunked peak {modes['chunked']['peak_rss_mb']} MB "
+                  f"in {modes['chunked']['seconds']:.2f}s (interpreter + imports {modes['chunked']['import_rss_mb']} MB)"
+                  f"{'' if same else '  OUTPUTS DIFFER'}")
+    return {'chunked': results}, ok
+
+
+def _dir_size(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, names in os.walk(path) for name in names)
+
+
+def run_storage(args):
+    results = {}
+    for n in args.sizes:
+        cleaner = app.DataCleaner.from_dataframe(synthetic_raw_products(n).assign(search_term='soft toys'))
+        with quiet():
+            cleaned = cleaner.clean()
+
+        result = {}
+        with tempfile.TemporaryDirectory() as tmp:
+            for file_format in ('csv', 'parquet'):
+                path = os.path.join(tmp, f"cleaned.{file_format}")
+                started = time.perf_counter()
+                app.save_products(cleaned, path, file_format, cleaned=True)
+                result[f"{file_format}_write_seconds"] = round(time.perf_counter() - started, 3)
+                result[f"{file_format}_mb"] = round(_dir_size(path) / 1024 / 1024, 2)
+
+                for label, columns in (('all', None), ('analysis', app.DataAnalyzer.ANALYSIS_COLUMNS)):
+                    started = time.perf_counter()
+                    app.load_products(path, columns=columns)
+                    result[f"{file_format}_load_{label}_seconds"] = round(time.perf_counter() - started, 3)
+        results[n] = result
+
+        print(f"{n:>10,} rows: CSV {result['csv_mb']} MB, load {result['csv_load_all_seconds']}s "
+              f"({result['csv_load_analysis_seconds']}s analysis columns) | Parquet {result['parquet_mb']} MB, "
+              f"load {result['parquet_load_all_seconds']}s ({result['parquet_load_analysis_seconds']}s analysis columns)")
+    return {'storage': results}, True
+
+
+def _parsed_rows(raw):
+    """Product field values as fresh str objects, the way a parser hands them out"""
+    columns = [raw[field].tolist() for field in app.ProductRecord.FIELDS]
+    for values in zip(*columns):
+        yield [(value + ' ')[:-1] for value in values]
+
+
+def run_records(args):
+    """Memory per 100k products held as dicts, slotted ProductRecords, or a columnar ProductBatch"""
+    raw = synthetic_raw_products(args.products).astype(str)
+    fields = app.ProductRecord.FIELDS
+    builders = {
+        'dicts': lambda rows: [dict(zip(fields, values)) for values in rows],
+        'records': lambda rows: [app.ProductRecord(*values) for values in rows],
+        'batch': lambda rows: app.ProductBatch(app.ProductRecord(*values) for values in rows),
+    }
+    to_frame = {
+        'dicts': pd.DataFrame,
+        'records': lambda products: app.ProductBatch(products).to_dataframe(),
+        'batch': lambda products: products.to_dataframe(),
+    }
+
+    results = {}
+    frames = {}
+    for name, build in builders.items():
+        tracemalloc.start()
+        products = build(_parsed_rows(raw))
+        held = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        started = time.perf_counter()
+        frames[name] = to_frame[name](products)
+        frame_seconds = time.perf_counter() - started
+        del products
+        results[name] = {
+            'mb_per_100k': round(held / args.products * 100_000 / 1024 / 1024, 2),
+            'bytes_per_product': round(held / args.products),
+            'to_dataframe_seconds': round(frame_seconds, 4),
+        }
+        print(f"{name:>8}: {results[name]['mb_per_100k']} MB per 100k products "
+              f"({results[name]['bytes_per_product']} bytes each), "
+              f"DataFrame in {results[name]['to_dataframe_seconds']}s")
+
+    ok = all(frame.equals(frames['dicts']) for frame in frames.values())
+    if not ok:
+        print("MISMATCH: the representations produced different DataFrames")
+    return {'records': {'products': args.products, 'results': results}}, ok
+
+
+IMPORT_SCENARIOS = {
+    # What a fetch-only worker loads: the module and a scraper with the default parser
+    'scraper': "import app; app.AmazonSponsoredScraper('soft toys')",
+    'cleaner': "import app; app.DataCleaner.from_dataframe(app.pd.DataFrame())",
+    'analysis': "import app; app.pd.DataFrame(); app._plotting()",
+}
+HEAVY_MODULES = ('pandas', 'numpy', 'matplotlib', 'seaborn', 'bs4', 'pyarrow')
+
+
+def import_profile(code):
+    """Total -X importtime microseconds for running code in a fresh interpreter, plus the heavy
+    top-level modules it loaded"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], capture_output=True,
+                            text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    total_us = 0
+    loaded = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Nested imports are indented under their parent; only count each tree once
+        if not name[1:].startswith(' '):
+            total_us += int(cumulative)
+        # importlib.import_module leaves out the package's own line, so match submodules too
+        package = name.strip().split('.')[0]
+        if package in HEAVY_MODULES:
+            loaded.add(package)
+    return total_us, sorted(loaded)
+
+
+def run_importtime(args):
+    """Cold-start import cost of each stage, taking the best of several fresh interpreters"""
+    results = {}
+    for scenario, code in IMPORT_SCENARIOS.items():
+        runs = [import_profile(code) for _ in range(args.repeat)]
+        best_us = min(total for total, _ in runs)
+        results[scenario] = {'import_ms': round(best_us / 1000, 1), 'heavy_modules': runs[0][1]}
+        print(f"{scenario:>9}: {results[scenario]['import_ms']} ms of imports, "
+              f"loads {', '.join(runs[0][1]) or 'no heavy modules'}")
+
+    ok = results['scraper']['import_ms'] <= args.max_scraper_ms and \
+        not {'pandas', 'matplotlib', 'seaborn'} & set(results['scraper']['heavy_modules'])
+    if not ok:
+        print(f"REGRESSION: the scraper imports exceed {args.max_scraper_ms} ms or pull in the analysis stack")
+    return {'importtime': results}, ok
+
+
+def small_sketch_parity():
+    """Sketch vs rescan on tiny crawls, where an even count's median falls between
+    two far-apart prices; returns the price lists whose statistics disagree"""
+    mismatches = []
+    for prices in ([100.0, 200.0, 900.0, 1000.0], [100.0, 200.0, 900.0], [0.0, 0.0, 100.0, 200.0]):
+        df = pd.DataFrame({
+            'product_title': [f"Toy {i}" for i in range(len(prices))], 'brand': "Brand 0",
+            'rating': 4.5, 'num_reviews': 20, 'selling_price': prices,
+            'image_url': "", 'product_url': "",
+        })
+        sketch = app.AnalyticsSketch().update(df)
+        approx, exact = app.ReportStats.from_sketch(sketch), app.ReportStats(df)
+        error = abs(approx.median_price - exact.median_price) / exact.median_price
+        if error > sketch.relative_accuracy or len(approx.value_products) != len(exact.value_products):
+            print(f"MISMATCH for prices {prices}: median {approx.median_price:.2f} vs {exact.median_price:.2f}, "
+                  f"{len(approx.value_products)} vs {len(exact.value_products)} value products")
+            mismatches.append(prices)
+    return mismatches
+
+
+def run_sketch(args):
+    """Fold crawls into an AnalyticsSketch and compare report statistics with a full rescan"""
+    with quiet():
+        crawls = [app.DataCleaner.from_dataframe(synthetic_raw_products(args.rows, seed)).clean()
+                  for seed in range(args.crawls)]
+
+    sketch = app.AnalyticsSketch()
+    update_seconds = []
+    for crawl in crawls:
+        started = time.perf_counter()
+        sketch.update(crawl)
+        update_seconds.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    approx = app.ReportStats.from_sketch(sketch)
+    sketch_seconds = time.perf_counter() - started
+
+    history = pd.concat(crawls, ignore_index=True)
+    started = time.perf_counter()
+    exact = app.ReportStats(history)
+    rescan_seconds = time.perf_counter() - started
+
+    median_error = abs(approx.median_price - exact.median_price) / exact.median_price
+    small_mismatches = small_sketch_parity()
+    ok = (approx.brand_counts.equals(exact.brand_counts)
+          and median_error <= sketch.relative_accuracy and not small_mismatches)
+    result = {
+        'crawls': args.crawls,
+        'rows_per_crawl': args.rows,
+        'mean_update_seconds': round(sum(update_seconds) / len(update_seconds), 4),
+        'sketch_report_seconds': round(sketch_seconds, 4),
+        'rescan_report_seconds': round(rescan_seconds, 4),
+        'median_relative_error': round(median_error, 5),
+        'sketch_kb': round(len(json.dumps(sketch.to_dict())) / 1024, 1),
+        'small_crawl_mismatches': small_mismatches,
+        'matches': ok,
+    }
+    print(f"{args.crawls} crawls x {args.rows:,} rows: update {result['mean_update_seconds']}s per crawl, "
+          f"report stats {result['sketch_report_seconds']}s from sketch vs {result['rescan_report_seconds']}s rescan, "
+          f"median error {median_error:.3%}, sketch {result['sketch_kb']} KB")
+    if not ok:
+        print("MISMATCH: sketch statistics fall outside their stated bounds")
+    return {'sketch': result}, ok
+
+
+def _report_in_child(cleaned_path, output_dir, results, formats=('md',)):
+    """Generate the report in a fresh process so its peak RSS is its own"""
+    os.chdir(output_dir)
+    df = pd.read_pickle(cleaned_path)
+    analyzer = app.DataAnalyzer(df)
+    timings = []
+    with quiet():
+        # Cold run renders every chart; the warm run finds them all unchanged
+        for _ in range(2):
+            started = time.perf_counter()
+            analyzer.generate_report(formats=formats)
+            timings.append(time.perf_counter() - started)
+    results.put({'cold_seconds': round(timings[0], 3), 'warm_seconds': round(timings[1], 3),
+                 'charts_skipped_warm': len(analyzer.renderer.skipped),
+                 'peak_rss_mb': round(_peak_rss_kb() / 1024, 1)})
+
+
+def run_report(args):
+    ctx = multiprocessing.get_context('spawn')
+    cleaner = app.DataCleaner.from_dataframe(synthetic_raw_products(args.rows))
+    with quiet():
+        cleaned = cleaner.clean()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cleaned_path = os.path.join(tmp, 'cleaned.pkl')
+        cleaned.to_pickle(cleaned_path)
+        output_dir = os.path.join(tmp, 'report')
+        os.makedirs(output_dir)
+        queue = ctx.Queue()
+        child = ctx.Process(target=_report_in_child, args=(cleaned_path, output_dir, queue, args.formats))
+        child.start()
+        result = queue.get()
+        child.join()
+    print(f"cold {result['cold_seconds']}s, unchanged rerun {result['warm_seconds']}s "
+          f"({result['charts_skipped_warm']} charts skipped), peak RSS {result['peak_rss_mb']} MB")
+    return {'report': {'rows': args.rows, 'formats': args.formats, **result}}, True
+
+
+def iterrows_table(df):
+    """Value-products table rows formatted the old way, one Series per row"""
+    rows = []
+    for _, product in df.iterrows():
+        rows.append(f"| {product['product_title'][:50]}... | {product['brand']} | {product['rating']:.1f} | "
+                    f"{product['selling_price']:.2f} | {product['num_reviews']} |")
+    return rows
+
+
+def column_table(df):
+    """The same rows as the report writers build them, from plain column lists"""
+    rows = app.report_table(df, {
+        'Product': ('product_title', '{:.50}...'),
+        'Brand': ('brand', '{}'),
+        'Rating': ('rating', '{:.1f}'),
+        'Price': ('selling_price', '{:.2f}'),
+        'Reviews': ('num_reviews', '{}'),
+    })['rows']
+    return ["| " + " | ".join(row) + " |" for row in rows]
+
+
+def run_tables(args):
+    cleaner = app.DataCleaner.from_dataframe(synthetic_raw_products(max(args.sizes)))
+    with quiet():
+        cleaned = cleaner.clean()[app.ReportStats.PRODUCT_FIELDS].dropna()
+    results = {}
+    ok = True
+    for size in args.sizes:
+        df = cleaned.head(size)
+        same = iterrows_table(df) == column_table(df)
+        ok = ok and same
+        timings = {}
+        for name, fn in (('iterrows', iterrows_table), ('columns', column_table)):
+            started = time.perf_counter()
+            fn(df)
+            timings[name] = time.perf_counter() - started
+        results[size] = {
+            'same_rows': same,
+            'iterrows_ms': round(timings['iterrows'] * 1000, 3),
+            'columns_ms': round(timings['columns'] * 1000, 3),
+            'speedup': round(timings['iterrows'] / timings['columns'], 1),
+        }
+        print(f"{size:>9} rows: iterrows {results[size]['iterrows_ms']:.1f} ms, "
+              f"column lists {results[size]['columns_ms']:.1f} ms ({results[size]['speedup']}x)"
+              f"{'' if same else '  ROWS DIFFER'}")
+    return {'tables': results}, ok
+
+
+def load_corpus(corpus=None, synthetic_pages=0):
+    """Recorded result pages from a fixtures directory or a PageArchive, plus synthetic ones"""
+    pages = []
+    if corpus and os.path.exists(os.path.join(corpus, 'index.jsonl')):
+        pages.extend(html_content for _, html_content in app.PageArchive(corpus).iter_pages())
+    elif corpus:
+        pages.extend(load_fixtures(corpus).values())
+    if synthetic_pages:
+        from local_server import render_results_page
+        pages.extend(render_results_page(page) for page in range(1, synthetic_pages + 1))
+    return pages
+
+
+def latency_summary(samples):
+    """Latency percentiles, in seconds, of a list of timings"""
+    ordered = sorted(samples)
+
+    def percentile(p):
+        return round(ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))], 6)
+
+    return {'count': len(ordered), 'p50_seconds': percentile(50), 'p95_seconds': percentile(95),
+            'p99_seconds': percentile(99), 'max_seconds': round(ordered[-1], 6)}
+
+
+def measure_stage(step, items, repeat):
+    """Time step() repeat times, then once more under tracemalloc for its peak heap"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = step()
+        timings.append(time.perf_counter() - started)
+    tracemalloc.start()
+    step()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    mean_seconds = sum(timings) / len(timings)
+    return result, {
+        'items': items,
+        'mean_seconds': round(mean_seconds, 4),
+        'items_per_second': round(items / mean_seconds, 1) if mean_seconds else None,
+        'latency': latency_summary(timings),
+        'peak_heap_mb': round(peak / 1024 / 1024, 1),
+    }
+
+
+def run_pipeline(args):
+    """Replay recorded pages through extract, clean and analyze without any network access"""
+    pages = load_corpus(args.corpus, args.synthetic_pages)
+    if not pages:
+        print("No pages to replay; pass --corpus or --synthetic-pages")
+        return {'pipeline': {}}, False
+    scraper = app.AmazonSponsoredScraper('soft toys', parser_backend=args.parser, streaming=args.streaming)
+    stages = {}
+
+    with quiet():
+        # 1. Extraction: per-page latencies over every repeat
+        page_timings = []
+
+        def extract():
+            products = []
+            for html_content in pages:
+                started = time.perf_counter()
+                products.extend(scraper.extract_sponsored_products(html_content))
+                if not tracemalloc.is_tracing():
+                    page_timings.append(time.perf_counter() - started)
+            return products
+
+        products, stages['extract'] = measure_stage(extract, len(pages), args.repeat)
+        stages['extract']['page_latency'] = latency_summary(page_timings)
+        stages['extract']['products'] = len(products)
+
+        # 2. Cleaning: the replayed products, padded with synthetic rows to the requested scale
+        raw = app.ProductBatch(products).to_dataframe()
+        if args.rows > len(raw):
+            raw = pd.concat([raw, synthetic_raw_products(args.rows - len(raw))], ignore_index=True)
+        cleaned, stages['clean'] = measure_stage(
+            lambda: app.DataCleaner.from_dataframe(raw.copy()).clean(), len(raw), args.repeat)
+
+        # 3. Analysis: a cold report (every chart drawn) on each run
+        with tempfile.TemporaryDirectory() as tmp:
+            cwd = os.getcwd()
+            os.chdir(tmp)
+            try:
+                def analyze():
+                    shutil.rmtree('amazon_analysis_output', ignore_errors=True)
+                    return app.DataAnalyzer(cleaned).generate_report()
+
+                _, stages['analyze'] = measure_stage(analyze, len(cleaned), args.repeat)
+            finally:
+                os.chdir(cwd)
+
+    results = {
+        'corpus_pages': len(pages),
+        'parser': args.parser,
+        'streaming': args.streaming,
+        'rows': len(raw),
+        'repeat': args.repeat,
+        'stages': stages,
+        'peak_rss_mb': round(_peak_rss_kb() / 1024, 1),
+    }
+    for name, stage in stages.items():
+        print(f"{name:>8}: {stage['items']:,} items, {stage['mean_seconds']}s per run "
+              f"({stage['items_per_second']:,} items/s), p95 {stage['latency']['p95_seconds']}s, "
+              f"peak heap {stage['peak_heap_mb']} MB")
+    print(f"Per page extraction: p50 {stages['extract']['page_latency']['p50_seconds'] * 1000:.2f} ms, "
+          f"p99 {stages['extract']['page_latency']['p99_seconds'] * 1000:.2f} ms; "
+          f"peak RSS {results['peak_rss_mb']} MB")
+    return {'pipeline': results}, bool(products)
+
+
+def _flatten(results, prefix=''):
+    flat = {}
+    for key, value in results.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{path}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = value
+    return flat
+
+
+def _direction(metric):
+    """+1 when bigger is better, -1 when smaller is better, 0 for counts and settings"""
+    name = metric.rsplit('.', 1)[-1]
+    if name.endswith(('per_second', 'per_sec')):
+        return 1
+    if name.endswith(('seconds', '_mb', '_kb', '_ms')):
+        return -1
+    return 0
+
+
+def run_compare(args):
+    """Compare two --json result files and flag metrics that got worse by more than --threshold"""
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = _flatten(json.load(f))
+    with open(args.current, encoding='utf-8') as f:
+        current = _flatten(json.load(f))
+
+    changes = {}
+    regressions = []
+    for metric in sorted(baseline.keys() & current.keys()):
+        direction = _direction(metric)
+        old, new = baseline[metric], current[metric]
+        if not direction or not old:
+            continue
+        change = (new - old) / abs(old)
+        changes[metric] = {'baseline': old, 'current': new, 'change': round(change, 4)}
+        worse = -direction * change
+        if worse > args.threshold:
+            regressions.append(metric)
+            print(f"REGRESSION {metric}: {old} -> {new} ({change:+.1%})")
+        elif abs(change) > args.threshold:
+            print(f"improved   {metric}: {old} -> {new} ({change:+.1%})")
+    print(f"{len(changes)} metrics compared, {len(regressions)} regressions beyond {args.threshold:.0%}")
+    return {'compare': {'threshold': args.threshold, 'regressions': regressions, 'changes': changes}}, \
+        not regressions
+
+
+def run_metadata():
+    """Where and on what code a benchmark ran, so result files can be compared across commits"""
+    commit = None
+    with contextlib.suppress(OSError, subprocess.CalledProcessError):
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    return {
+        'commit': commit,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def run_parsers(args):
+    pages = load_fixtures(args.fixtures)
+    backends = available_backends()
+
+    mismatches = check_parser_parity(pages, backends)
+    for mismatch in mismatches:
+        print(f"PARITY MISMATCH: {mismatch['backend']} on {mismatch['fixture']}")
+        print(f"  expected: {mismatch['expected']}")
+        print(f"  actual:   {mismatch['actual']}")
+    print(f"Parity: {len(backends)} backends x {len(pages)} fixtures, {len(mismatches)} mismatches")
+
+    results = bench_parsers(pages, backends, args.repeat)
+    for name, result in results.items():
+        print(f"{name:>12}: {result['pages_per_sec']:>8.1f} pages/sec")
+    return {'parity_mismatches': len(mismatches), 'parsers': results}, not mismatches
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks for the scraping pipeline")
+    parser.add_argument('--json', help="also write the results to this JSON file")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    parsers = subparsers.add_parser('parsers', help="parser backend parity check and pages/sec")
+    parsers.add_argument('--fixtures', default=FIXTURES_DIR)
+    parsers.add_argument('--repeat', type=int, default=20)
+    parsers.set_defaults(run=run_parsers)
+
+    streaming = subparsers.add_parser('streaming', help="card-scoped streaming vs whole-page extraction")
+    streaming.add_argument('--fixtures', default=FIXTURES_DIR)
+    streaming.add_argument('--repeat', type=int, default=10)
+    streaming.add_argument('--chrome-kb', type=int, default=256,
+                           help="KB of non-result markup added before and after the cards of each fixture")
+    streaming.set_defaults(run=run_streaming)
+
+    clean = subparsers.add_parser('clean', help="row-wise vs vectorized DataCleaner.clean")
+    clean.add_argument('--sizes', type=int, nargs='+', default=[10_000, 1_000_000, 10_000_000])
+    clean.add_argument('--rowwise-max', type=int, default=0,
+                       help="skip the row-wise path above this many rows (0 = never skip)")
+    clean.set_defaults(run=run_clean)
+
+    chunked = subparsers.add_parser('chunked', help="peak RSS of whole-file vs chunked cleaning")
+    chunked.add_argument('--sizes', type=int, nargs='+', default=[100_000, 1_000_000])
+    chunked.add_argument('--chunksize', type=int, default=100_000)
+    chunked.set_defaults(run=run_chunked)
+
+    storage = subparsers.add_parser('storage', help="file size and load time of CSV vs Parquet")
+    storage.add_argument('--sizes', type=int, nargs='+', default=[100_000, 1_000_000])
+    storage.set_defaults(run=run_storage)
+
+    report = subparsers.add_parser('report', help="generate_report time and memory, cold and with unchanged charts")
+    report.add_argument('--rows', type=int, default=100_000)
+    report.add_argument('--formats', nargs='+', default=['md'], choices=sorted(app.REPORT_WRITERS))
+    report.set_defaults(run=run_report)
+
+    tables = subparsers.add_parser('tables', help="iterrows vs column-list report table formatting")
+    tables.add_argument('--sizes', type=int, nargs='+', default=[10, 1_000, 100_000])
+    tables.set_defaults(run=run_tables)
+
+    records = subparsers.add_parser('records', help="memory of dict vs slotted vs columnar product records")
+    records.add_argument('--products', type=int, default=100_000)
+    records.set_defaults(run=run_records)
+
+    importtime = subparsers.add_parser('importtime', help="-X importtime cold start of each stage")
+    importtime.add_argument('--repeat', type=int, default=5)
+    importtime.add_argument('--max-scraper-ms', type=float, default=400.0,
+                            help="fail when the scraper stage's imports take longer than this")
+    importtime.set_defaults(run=run_importtime)
+
+    sketch = subparsers.add_parser('sketch', help="incremental summary sketch vs full-history rescan")
+    sketch.add_argument('--crawls', type=int, default=30)
+    sketch.add_argument('--rows', type=int, default=20_000)
+    sketch.set_defaults(run=run_sketch)
+
+    memo = subparsers.add_parser('memo', help="card fingerprint memo: cold vs warm extraction")
+    memo.add_argument('--fixtures', default=FIXTURES_DIR)
+    memo.add_argument('--synthetic-pages', type=int, default=50)
+    memo.add_argument('--max-entries', type=int, default=20_000)
+    memo.set_defaults(run=run_memo)
+
+    cache = subparsers.add_parser('cache', help="cold vs cached vs revalidated crawl against a local server")
+    cache.add_argument('--pages', type=int, default=10)
+    cache.set_defaults(run=run_cache)
+
+    concurrent = subparsers.add_parser('concurrent', help="sequential vs concurrent scrape against a local server")
+    concurrent.add_argument('--pages', type=int, default=10)
+    concurrent.add_argument('--delay', type=float, default=0.2, help="seconds the local server takes per page")
+    concurrent.set_defaults(run=run_concurrent)
+
+    throttle = subparsers.add_parser('throttle', help="fixed vs adaptive rate limiting against a throttling server")
+    throttle.add_argument('--pages', type=int, default=60)
+    throttle.add_argument('--server-rate', type=float, default=5.0,
+                          help="requests/sec the local server allows before refusing")
+    throttle.add_argument('--server-burst', type=int, default=5)
+    throttle.add_argument('--start-rate', type=float, default=20.0,
+                          help="requests/sec both limiters start at")
+    throttle.set_defaults(run=run_throttle)
+
+    pipeline = subparsers.add_parser('pipeline', help="offline replay of recorded pages through extract, clean and analyze")
+    pipeline.add_argument('--corpus', default=FIXTURES_DIR,
+                          help="directory of recorded .html pages, or a --archive-dir page archive")
+    pipeline.add_argument('--synthetic-pages', type=int, default=200,
+                          help="synthetic result pages added to the corpus")
+    pipeline.add_argument('--rows', type=int, default=100_000,
+                          help="pad the extracted products with synthetic rows up to this many")
+    pipeline.add_argument('--parser', default='bs4', choices=sorted(app.PARSER_BACKENDS))
+    pipeline.add_argument('--streaming', action='store_true')
+    pipeline.add_argument('--repeat', type=int, default=3)
+    pipeline.set_defaults(run=run_pipeline)
+
+    compare = subparsers.add_parser('compare', help="flag regressions between two --json result files")
+    compare.add_argument('baseline')
+    compare.add_argument('current')
+    compare.add_argument('--threshold', type=float, default=0.10,
+                         help="relative change counted as a regression")
+    compare.set_defaults(run=run_compare)
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results, ok = args.run(args)
+    if args.json:
+        results['meta'] = run_metadata()
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.json}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
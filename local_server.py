@@ -0,0 +1,171 @@
+import hashlib
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+def render_card(page, index, sponsored=True):
+    """Render one search result card using the markup the scraper selects on"""
+    asin = f"B0{page:04d}{index:04d}"
+    label = ('<span class="s-label-popover-default">'
+             '<span class="a-color-secondary">Sponsored</span></span>') if sponsored else ''
+    return (
+        f'<div data-component-type="s-search-result" data-asin="{asin}">'
+        f'{label}'
+        f'<h5><span class="a-size-base">Brand {index % 7}</span></h5>'
+        f'<h2><a class="a-link-normal" href="/dp/{asin}">'
+        f'<span>Soft Toy {page}-{index} Teddy Bear</span></a></h2>'
+        f'<i class="a-icon-star-small"><span>{3 + (index % 20) / 10:.1f} out of 5 stars</span></i>'
+        f'<span class="a-size-base s-underline-text">{(index * 137) % 5000:,}</span>'
+        f'<span class="a-price-whole">{199 + index * 10:,}</span>'
+        f'<img class="s-image" src="https://m.media-amazon.com/images/I/{asin}.jpg"/>'
+        f'</div>'
+    )
+
+
+def render_results_page(page, cards_per_page=20, sponsored_every=2):
+    """Render a canned search results page"""
+    cards = ''.join(render_card(page, i, sponsored=(i % sponsored_every == 0))
+                    for i in range(cards_per_page))
+    return (
+        '<html><head><title>Amazon.in : soft toys</title></head><body>'
+        f'<div class="s-main-slot">{cards}</div>'
+        '</body></html>'
+    )
+
+
+def render_robot_check_page():
+    """Render the CAPTCHA interstitial Amazon serves, with status 200, to suspected bots"""
+    return (
+        '<html><head><title>Amazon.in</title></head><body>'
+        '<h4>Enter the characters you see below</h4>'
+        "<p>Sorry, we just need to make sure you're not a robot.</p>"
+        '<form method="get" action="/errors/validateCaptcha">'
+        '<img src="https://images-na.ssl-images-amazon.com/captcha/abc/Captcha_xyz.jpg">'
+        '<input id="captchacharacters" name="field-keywords"></form>'
+        '</body></html>'
+    )
+
+
+class CannedPageServer:
+    """Local HTTP stand-in for the Amazon search endpoint, serving canned result pages.
+
+    With rate_limit set it throttles like the real site: requests beyond a token bucket of
+    rate_limit per second (burst deep) get a 429 with Retry-After, or a robot check page
+    when block_mode is 'captcha', and responses slow down by overload_delay as it fills up.
+    """
+    def __init__(self, pages=None, cards_per_page=20, delay=0.0, rate_limit=None, burst=5,
+                 block_mode='429', retry_after=None, overload_delay=0.0):
+        self.pages = pages or {}
+        self.cards_per_page = cards_per_page
+        self.delay = delay
+        self.rate_limit = rate_limit
+        self.burst = burst
+        self.block_mode = block_mode
+        self.retry_after = retry_after
+        self.overload_delay = overload_delay
+        self.requests_served = 0
+        self.throttled_served = 0
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self._httpd = None
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def page_html(self, page):
+        """Return the canned page, rendering a synthetic one if none was supplied"""
+        if page not in self.pages:
+            self.pages[page] = render_results_page(page, self.cards_per_page)
+        return self.pages[page]
+
+    def _admit(self):
+        """Take a token from the server-side bucket; returns (admitted, extra latency)"""
+        if self.rate_limit is None:
+            return True, 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate_limit)
+            self._updated = now
+            if self._tokens < 1:
+                self.throttled_served += 1
+                return False, 0.0
+            self._tokens -= 1
+            # Latency grows as the bucket drains, the early warning a polite client can use
+            return True, self.overload_delay * (1 - self._tokens / self.burst)
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                query = parse_qs(urlparse(self.path).query)
+                page = int(query.get('page', ['1'])[0])
+                with server._lock:
+                    server.requests_served += 1
+                admitted, extra_delay = server._admit()
+                if server.delay or extra_delay:
+                    threading.Event().wait(server.delay + extra_delay)
+
+                if not admitted and server.block_mode != 'captcha':
+                    body = b'Too Many Requests'
+                    self.send_response(429)
+                    if server.retry_after is not None:
+                        self.send_header('Retry-After', str(server.retry_after))
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                    return
+
+                html = server.page_html(page) if admitted else render_robot_check_page()
+                body = html.encode('utf-8')
+                etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+                if self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.end_headers()
+                    return
+
+                self.send_response(200)
+                self.send_header('ETag', etag)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._httpd = ThreadingHTTPServer(('127.0.0.1', 0), self._make_handler())
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    with CannedPageServer() as server:
+        print(f"Serving canned result pages on {server.base_url}/s?k=soft+toys&page=1")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass